@@ -17,6 +17,7 @@ from accounts.serializers.auth import (
     VerifyOtpSerializer,
 )
 from accounts.services.auth import AuthService
+from services.throttle import throttle
 from services.util import CustomApiRequestProcessorBase, user_type_required
 
 
@@ -40,7 +41,7 @@ class LoginView(TokenObtainPairView, CustomApiRequestProcessorBase):
             400: {"type": "object", "properties": {"error": {"type": "string"}}},
         },
     )
-    @method_decorator(ratelimit(key="ip", rate="3/m"))
+    @method_decorator(throttle("login", rate="3/m"))
     def post(self, request, *args, **kwargs):
         service = AuthService(request)
         return self.process_request(request, service.login)
@@ -52,7 +53,7 @@ class SignupView(CreateAPIView, CustomApiRequestProcessorBase):
     serializer_class = SignupSerializer
 
     @extend_schema(tags=["Auth"])
-    @method_decorator(ratelimit(key="ip", rate="5/m"))
+    @method_decorator(throttle("signup", rate="5/m"))
     def post(self, request, *args, **kwargs):
         service = AuthService(request)
         return self.process_request(request, service.log_register)
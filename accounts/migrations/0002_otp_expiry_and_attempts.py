@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="passwordresetrequest",
+            name="otp_attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="passwordresetrequest",
+            name="otp_expires_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="registerlog",
+            name="otp_attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="registerlog",
+            name="otp_expires_at",
+            field=models.DateTimeField(null=True),
+        ),
+    ]
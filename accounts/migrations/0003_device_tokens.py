@@ -0,0 +1,115 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+TOKEN_MAX_LENGTH = 512
+DEVICE_FIELD_MAX_LENGTH = 255
+
+
+def clip(value):
+    return value[:DEVICE_FIELD_MAX_LENGTH] if isinstance(value, str) else value
+
+
+def copy_device_tokens(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    DeviceToken = apps.get_model("accounts", "DeviceToken")
+
+    # a token could end up on several users before; the latest login keeps it
+    holders = {}
+    devices = []
+    users = User._base_manager.order_by(
+        models.F("last_login").asc(nulls_first=True)
+    ).values_list("id", "fcm_token", "devices", "last_login")
+    for user_id, token, user_devices, last_login in users.iterator():
+        # fcm_token was unbounded; a cut token is useless, so longer ones are dropped
+        if token and len(token) <= TOKEN_MAX_LENGTH:
+            holders[token] = (user_id, last_login)
+        for device in user_devices or []:
+            devices.append(
+                DeviceToken(
+                    user_id=user_id,
+                    device_id=clip(device.get("device_id")),
+                    device_name=clip(device.get("device_name")),
+                )
+            )
+
+    DeviceToken.objects.bulk_create(
+        [
+            DeviceToken(
+                user_id=user_id,
+                token=token,
+                last_used_at=last_login or timezone.now(),
+            )
+            for token, (user_id, last_login) in holders.items()
+        ]
+        + devices,
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_otp_expiry_and_attempts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeviceToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "token",
+                    models.CharField(
+                        blank=True, max_length=512, null=True, unique=True
+                    ),
+                ),
+                ("device_id", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "device_name",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "last_used_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="device_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-last_used_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-last_used_at"], name="device_token_user_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(copy_device_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="user",
+            name="devices",
+        ),
+        migrations.RemoveField(
+            model_name="user",
+            name="fcm_token",
+        ),
+    ]
@@ -3,6 +3,7 @@ import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import Q, TextChoices
+from django.utils import timezone
 
 from accounts.constants.roles_permissions import RoleEnum
 from crm.models import BaseModel
@@ -40,8 +41,6 @@ class User(AbstractUser, BaseModel):
     country = models.CharField(max_length=100)
     registration_complete = models.BooleanField(default=False)
     update_kyc_required = models.BooleanField(default=True)
-    fcm_token = models.TextField(null=True, blank=True)
-    devices = models.JSONField(default=list)
     address = models.CharField(
         max_length=300, null=True, blank=True
     ) 
@@ -72,23 +71,44 @@ class User(AbstractUser, BaseModel):
     def natural_key(self):
         return self.username
 
+    @property
+    def fcm_token(self):
+        """Push token of the device this user signed in on most recently."""
+        return (
+            self.device_tokens.exclude(token=None)
+            .values_list("token", flat=True)
+            .first()
+        )
+
+    @property
+    def devices(self):
+        return list(self.device_tokens.values("device_id", "device_name"))
+
+    def get_roles(self):
+        # users authenticated from the cached snapshot carry their role ids,
+        # which saves the join (and the query, when they have none)
+        role_ids = getattr(self, "_role_ids", None)
+        if role_ids is None:
+            return self.roles.all()
+        return Role.objects.filter(id__in=role_ids)
+
     def has_permission(self, perm_name):
         """Check if the user has a specific permission"""
         if self.is_superuser:
             return True
-        return self.roles.filter(
+        return self.get_roles().filter(
             Q(permissions__name=perm_name) | Q(name__exact=RoleEnum.sysadmin)
         ).exists()
 
     def has_role(self, role_name):
         """Check if the user has a specific role."""
-        return self.roles.filter(
+        return self.get_roles().filter(
             Q(name=role_name) | Q(name__exact=RoleEnum.sysadmin)
         ).exists()
 
     def has_any_of_roles(self, role_names):
         """Check if the user has any of a list of roles."""
-        return self.roles.filter(
+        return self.get_roles().filter(
             Q(name__in=role_names) | Q(name__exact=RoleEnum.sysadmin)
         ).exists()
 
@@ -111,11 +131,69 @@ class Profile(BaseModel):
         return f"{self.user.username}'s Profile"
 
 
+class DeviceToken(models.Model):
+    """
+    A device a user signs in on and its push (FCM) token. A token belongs
+    to one user at a time: the unique index on it makes handing it over to
+    whoever signs in on the device a single upsert.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="device_tokens"
+    )
+    token = models.CharField(max_length=512, unique=True, null=True, blank=True)
+    device_id = models.CharField(max_length=255, null=True, blank=True)
+    device_name = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-last_used_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-last_used_at"], name="device_token_user_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.device_name or self.token}"
+
+    @classmethod
+    def register(cls, user, token, device_id=None, device_name=None):
+        """
+        Records that `user` is signed in on the device holding `token`,
+        taking the token over from any other user, in one
+        INSERT ... ON CONFLICT (token) DO UPDATE.
+        """
+        update_fields = ["user", "last_used_at"]
+        if device_id:
+            update_fields.append("device_id")
+        if device_name:
+            update_fields.append("device_name")
+
+        cls.objects.bulk_create(
+            [
+                cls(
+                    user=user,
+                    token=token,
+                    device_id=device_id,
+                    device_name=device_name,
+                    last_used_at=timezone.now(),
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["token"],
+            update_fields=update_fields,
+        )
+
+
 class RegisterLog(BaseModel):
     email = models.EmailField(unique=True, null=False)
     payload = models.JSONField()
     otp = models.CharField(max_length=255, null=False)
     otp_requested_at = models.DateTimeField(null=False)
+    otp_expires_at = models.DateTimeField(null=True)
+    otp_attempts = models.PositiveSmallIntegerField(default=0)
     is_verified = models.BooleanField(default=False)
     otp_verified_at = models.DateTimeField(null=True)
 
@@ -151,6 +229,8 @@ class PasswordResetRequest(BaseModel):
         related_name="password_reset_request",
     )
     otp = models.CharField(max_length=255, null=True)
+    otp_expires_at = models.DateTimeField(null=True)
+    otp_attempts = models.PositiveSmallIntegerField(default=0)
     status = models.CharField(
         max_length=255,
         choices=PasswordResetRequestStatus.choices,
@@ -1,7 +1,6 @@
 from disposable_email_checker.validators import validate_disposable_email
 from django.conf import settings
 from django.contrib.auth import authenticate
-from django.contrib.auth.hashers import make_password
 from django.db.models import Q
 from django.utils.translation import gettext as translate
 from email_validator import validate_email
@@ -12,10 +11,18 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from accounts.models import User
 from accounts.services.users import UserService
-from services.cache_util import CacheUtil
+from core.exceptions.custom_exception_handler import ServiceBusyException
 from services.log import AppLogger
+from services.password_hashing import make_password
+from services.throttle import SlidingWindowThrottle, get_client_ip
 from services.util import format_phone_number, render_template_to_text
 
+login_failures = SlidingWindowThrottle(
+    "login_failures",
+    limit=settings.LOGIN_THROTTLE_USER_FAILURES,
+    window=settings.LOGIN_THROTTLE_WINDOW,
+)
+
 
 class UserPasswordResetSerializer(serializers.Serializer):
     username = serializers.CharField()
@@ -55,14 +62,17 @@ class LoginSerializer(TokenObtainSerializer):
 
         authenticate_kwargs = {"username": username, "password": password}
 
-        cache_util = CacheUtil()
-        login_count_cache_key = cache_util.generate_cache_key("login_count", username)
-
-        login_count, error = cache_util.get_cache_value_or_default(
-            cache_key=login_count_cache_key
-        )
-
-        if login_count and login_count >= 10:
+        # failed attempts are counted per username and per client IP: every
+        # attempt is counted up front (so parallel ones cannot all pass the
+        # check) and refunded once the password turns out to be right
+        request = self.context.get("request")
+        client_ip = get_client_ip(request) if request else ""
+        identities = (f"user:{username}", f"ip:{client_ip}")
+        user_count, ip_count = login_failures.hit(*identities)
+        if (
+            user_count > settings.LOGIN_THROTTLE_USER_FAILURES
+            or ip_count > settings.LOGIN_THROTTLE_IP_FAILURES
+        ):
             raise serializers.ValidationError(
                 translate("auth.login.account_deactivated.too.many.tries"), "username"
             )
@@ -78,6 +88,9 @@ class LoginSerializer(TokenObtainSerializer):
             raise serializers.ValidationError(
                 translate("auth.login.mistaken_identity"), "username"
             )
+        except ServiceBusyException:
+            login_failures.refund(*identities)
+            raise
 
         except Exception as e:
             AppLogger.report(e)
@@ -89,10 +102,7 @@ class LoginSerializer(TokenObtainSerializer):
             )
 
         if self.user is None:
-            login_count = 1 if login_count is None else login_count + 1
-            cache_util.set_cache_value(login_count_cache_key, login_count, timeout=1200)
-
-            if login_count > 5 and not settings.DEBUG:
+            if user_count > 5 and not settings.DEBUG:
                 raise serializers.ValidationError(
                     {"username": translate("auth.login.access_denied")}
                 )
@@ -100,6 +110,8 @@ class LoginSerializer(TokenObtainSerializer):
                 # {"username": translate("auth.login.access_denied")}
                 {"username": "Invalid Credentials"}
             )
+        login_failures.refund(*identities)
+
         if self.user.deleted_at:
             raise serializers.ValidationError(translate("auth.login.error"), "username")
 
@@ -184,13 +196,17 @@ class EmailSerializer(serializers.Serializer):
 class OTPSerializer(serializers.Serializer):
     otp = serializers.CharField()
     email = serializers.EmailField()
-    fcm_token = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    fcm_token = serializers.CharField(
+        required=False, allow_null=True, allow_blank=True, max_length=512
+    )
 
 
 class VerifyAuthenticatorOtpSerializer(serializers.Serializer):
     email = serializers.EmailField()
     token = serializers.CharField()
-    fcm_token = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    fcm_token = serializers.CharField(
+        required=False, allow_null=True, allow_blank=True, max_length=512
+    )
 
 
 class UserOTPSerializer(serializers.ModelSerializer):
@@ -209,7 +225,9 @@ class RegistrationSerializer(serializers.Serializer):
     phone_number = serializers.CharField()
     username = serializers.CharField()
     gender = serializers.CharField(required=True, allow_null=False, allow_blank=False)
-    fcm_token = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    fcm_token = serializers.CharField(
+        required=False, allow_null=True, allow_blank=True, max_length=512
+    )
     dob = serializers.DateField()
     email = serializers.EmailField()
     address = serializers.CharField(required=False)
@@ -8,6 +8,7 @@ from django.utils.translation import gettext as _
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from accounts.models import (
+    DeviceToken,
     PasswordResetRequest,
     PasswordResetRequestStatus,
     RegisterLog,
@@ -22,15 +23,19 @@ from accounts.tasks import (
 
 from crm.services.clients import ClientService
 
+from core.exceptions.custom_exception_handler import ServiceBusyException
 from services.log import AppLogger
+from services.otp import OtpStatus, issue_otp, verify_otp
+from services.password_hashing import check_password, make_password
 from services.util import (
     CustomAPIRequestUtil,
     check_otp_time_expired,
-    compare_password,
-    generate_otp,
     generate_username,
 )
 
+REGISTER_OTP_PURPOSE = "register"
+PASSWORD_RESET_OTP_PURPOSE = "password_reset"
+
 
 class AuthService(CustomAPIRequestUtil):
     def login(self, payload) -> dict:
@@ -43,8 +48,7 @@ class AuthService(CustomAPIRequestUtil):
         username = user.username
         user_service = UserService(self.request)
 
-        permissions = user_service.get_user_permission_names(user)
-        roles = user_service.get_user_role_names(user)
+        permissions, roles = user_service.get_user_permission_and_role_names(user)
 
         user_type = user.user_type or UserTypes.student
 
@@ -77,7 +81,9 @@ class AuthService(CustomAPIRequestUtil):
                 AppLogger.report(error)
                 return message, None
 
-            otp, hashed_otp = generate_otp()
+            otp, hashed_otp, expires_at = issue_otp(
+                PASSWORD_RESET_OTP_PURPOSE, str(user.pk)
+            )
 
             if not hasattr(user, "password_reset_request"):
                 self.create_password_reset_request(user)
@@ -85,10 +91,20 @@ class AuthService(CustomAPIRequestUtil):
             password_reset_request = user.password_reset_request
 
             password_reset_request.otp = hashed_otp
+            password_reset_request.otp_expires_at = expires_at
+            password_reset_request.otp_attempts = 0
             password_reset_request.status = PasswordResetRequestStatus.available
             password_reset_request.updated_at = timezone.now()
 
-            password_reset_request.save(update_fields=["otp", "status", "updated_at"])
+            password_reset_request.save(
+                update_fields=[
+                    "otp",
+                    "otp_expires_at",
+                    "otp_attempts",
+                    "status",
+                    "updated_at",
+                ]
+            )
 
             # Send email
             self.send_reset_password_link_email(email, otp)
@@ -112,27 +128,38 @@ class AuthService(CustomAPIRequestUtil):
                 password_reset_request = getattr(user, "password_reset_request", None)
 
                 if password_reset_request:
-                    if not compare_password(otp, password_reset_request.otp):
-                        return {"message": _("invalid.otp")}
-
                     if (
                         password_reset_request.status
                         != PasswordResetRequestStatus.available
-                        or check_otp_time_expired(password_reset_request.updated_at)
                     ):
+                        return None, self.make_error(_("expired.otp"))
+
+                    otp_status = verify_otp(
+                        password_reset_request,
+                        otp,
+                        PASSWORD_RESET_OTP_PURPOSE,
+                        str(user.pk),
+                    )
+                    if otp_status in (OtpStatus.expired, OtpStatus.locked):
                         password_reset_request.status = (
                             PasswordResetRequestStatus.expired
                         )
                         password_reset_request.save(update_fields=["status"])
-                        return {"message": _("expired.otp")}
+                        return None, self.make_error(_("expired.otp"))
+                    if otp_status != OtpStatus.valid:
+                        return None, self.make_error(_("invalid.otp"))
 
-                    user.set_password(password)
+                    user.password = make_password(password)
                     user.save()
+                    # tokens carrying the old password hash must stop working
+                    UserService(self.request).clear_temp_cache(user)
                     password_reset_request.status = PasswordResetRequestStatus.expired
                     password_reset_request.save(update_fields=["status"])
 
             return {"message": _("auth.reset_password.successful")}, None
 
+        except ServiceBusyException:
+            raise
         except Exception as e:
             return None, self.make_500(e)
 
@@ -153,18 +180,21 @@ class AuthService(CustomAPIRequestUtil):
                 return {"error": "New password not provided."}, None
 
             # Verify that the provided current password is correct.
-            if not user.check_password(current_password):
+            if not check_password(user, current_password):
                 return {"error": "Wrong current password provided."}, None
 
             # Prevent using the same password.
-            if user.check_password(new_password):
+            if check_password(user, new_password):
                 return {"error": "Password is duplicate of the old one."}, None
 
             # Update and persist the new password.
-            user.set_password(new_password)
+            user.password = make_password(new_password)
             user.save()
+            UserService(self.request).clear_temp_cache(user)
             return {"message": "Password updated successfully."}, None
 
+        except ServiceBusyException:
+            raise
         except Exception as e:
             # Log the exception as needed before returning.
             return None, self.make_500(e)
@@ -193,13 +223,14 @@ class AuthService(CustomAPIRequestUtil):
             log, error = None, None
             full_name = payload.get("full_name", "")
             try:
-                otp, hashed_otp = generate_otp()
+                otp, hashed_otp, expires_at = issue_otp(REGISTER_OTP_PURPOSE, email)
 
                 log = RegisterLog.objects.create(
                     email=email,
                     payload=payload,
                     otp=hashed_otp,
                     otp_requested_at=timezone.now(),
+                    otp_expires_at=expires_at,
                 )
                 log.save()
 
@@ -211,7 +242,9 @@ class AuthService(CustomAPIRequestUtil):
             return log, error
 
         cache_key = self.generate_cache_key("log", "email", email)
-        return self.get_cache_value_or_default(cache_key, do_create)
+        return self.get_cache_value_or_default(
+            cache_key, do_create, require_fresh_data=True
+        )
 
     def __update_log(self, log, **kwargs):
         def do_update():
@@ -303,10 +336,16 @@ class AuthService(CustomAPIRequestUtil):
                 return response_data, None
 
             # Resend Activation OTP
-            otp, hashed_otp = generate_otp()
+            otp, hashed_otp, expires_at = issue_otp(REGISTER_OTP_PURPOSE, log.email)
 
             self.send_activation_otp(email, otp, full_name)
-            self.__update_log(log, otp=hashed_otp, otp_requested_at=timezone.now())
+            self.__update_log(
+                log,
+                otp=hashed_otp,
+                otp_requested_at=timezone.now(),
+                otp_expires_at=expires_at,
+                otp_attempts=0,
+            )
 
             return response_data, None
 
@@ -325,19 +364,16 @@ class AuthService(CustomAPIRequestUtil):
 
             if not log:
                 return None, self.make_404("Account details not found, Register first!")
-            # Check OTP is valid
-            otp_valid = compare_password(otp, log.otp)
-            if not otp_valid:
-                # return None, self.make_error(_("invalid.otp"))
-                return None, self.make_error("Invalid OTP provided")
-
-            # Check OTP time
-            otp_expired = check_otp_time_expired(otp_requested_at=log.otp_requested_at)
-            if otp_expired:
+            # Check OTP is valid and unexpired
+            otp_status = verify_otp(log, otp, REGISTER_OTP_PURPOSE, log.email)
+            if otp_status in (OtpStatus.expired, OtpStatus.locked):
                 # return None, self.make_error(_("expired.otp"))
                 return None, self.make_error(
                     "Provided OTP has expired, please request for new OTP"
                 )
+            if otp_status != OtpStatus.valid:
+                # return None, self.make_error(_("invalid.otp"))
+                return None, self.make_error("Invalid OTP provided")
 
             log, error = self.__update_log(
                 log, is_verified=True, otp_verified_at=timezone.now()
@@ -449,14 +485,11 @@ class AuthService(CustomAPIRequestUtil):
     @classmethod
     def update_last_login(cls, user, fcm_token=None):
         user.last_login = timezone.now()
-        user.fcm_token = fcm_token
-
-        user.save(update_fields=["last_login", "fcm_token"])
+        user.save(update_fields=["last_login"])
+        UserService(None).clear_temp_cache(user)
 
         if fcm_token:
-            User.objects.exclude(fcm_token=fcm_token).exclude(pk=user.pk).update(
-                fcm_token=None
-            )
+            DeviceToken.register(user, fcm_token)
 
     def validate_authenticator_otp(self, payload):
         pass
@@ -8,10 +8,13 @@ from accounts.models import Permission, Role
 from accounts.serializers.roles_permissions import PermissionSerializer, RoleSerializer
 from core.errors.app_errors import OperationError
 from crm.constants import ActivityType
+from services.pagination import CountStrategy
 from services.util import CustomAPIRequestUtil
 
 
 class PermissionService(CustomAPIRequestUtil):
+    count_strategy = CountStrategy.estimated
+
     @staticmethod
     def create_default_permissions():
         permission_ids = []
@@ -56,10 +59,12 @@ class PermissionService(CustomAPIRequestUtil):
         page = self.paginate_queryset(queryset, request=self.request)
         data = PermissionSerializer(page, many=True).data
 
-        return self.get_paginated_list_response(data, queryset.count())
+        return self.get_paginated_list_response(data, self.get_paginated_total())
 
 
 class RoleService(CustomAPIRequestUtil):
+    count_strategy = CountStrategy.cached
+
     @staticmethod
     def create_default_roles():
         role, is_created = Role.objects.update_or_create(
@@ -89,6 +94,10 @@ class RoleService(CustomAPIRequestUtil):
         role.save()
         self.report_activity(ActivityType.create, role)
 
+        # a lookup for this id may have been cached as "not found"
+        cache_key = self.generate_cache_key("role_id", role.id)
+        self.clear_cache(cache_key)
+
         return role, None
 
     def delete(self, role_id):
@@ -173,4 +182,4 @@ class RoleService(CustomAPIRequestUtil):
         page = self.paginate_queryset(queryset, request=self.request)
         data = RoleSerializer(page, many=True).data
 
-        return self.get_paginated_list_response(data, queryset.count())
+        return self.get_paginated_list_response(data, self.get_paginated_total())
@@ -2,22 +2,40 @@ import random
 import string
 from typing import Any, List, Optional, Tuple
 
-from django.contrib.auth.hashers import make_password
-from django.db import transaction
+from django.conf import settings
+from django.db import router, transaction
 from django.db.models import Q
 from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 
 from accounts.constants.roles_permissions import RoleEnum
-from accounts.models import Permission, Role, User, UserTypes
+from accounts.models import DeviceToken, Permission, Role, User, UserTypes
 from accounts.serializers.users import UserListSerializer
 from accounts.services.roles_permissions import RoleService
 from core.errors.app_errors import OperationError
 from crm.constants import ActivityType
 from services.log import AppLogger
+from services.pagination import CountStrategy
+from services.password_hashing import make_password
 from services.util import CustomAPIRequestUtil, generate_password
 
 
 class UserService(CustomAPIRequestUtil):
+    count_strategy = CountStrategy.cached
+
+    # What request.user holds when authenticated from the cache (see
+    # core.backends.cached_jwt_authentication); other fields load lazily.
+    # Bump the version whenever the snapshot changes shape.
+    # Every column but the password hash, so reading request.user never
+    # falls back to a deferred-field query; only `password` loads on access.
+    AUTH_SNAPSHOT_FIELDS = tuple(
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname != "password"
+    )
+    AUTH_SNAPSHOT_VERSION = 2
+
     def gen_cache_key(
         self, key_type: str, user: Optional[User] = None, user_id: Optional[int] = None
     ) -> str:
@@ -36,39 +54,59 @@ class UserService(CustomAPIRequestUtil):
         return ""
 
     def get_user_permission_names(self, user: User) -> List[str]:
-        def __do_get_permission_names() -> Tuple[List[str], None]:
-            if (
-                user.is_superuser
-                or user.roles.filter(name__exact=RoleEnum.sysadmin).exists()
-            ):
-                permissions = Permission.objects.values_list("name", flat=True)
-            else:
-                permissions = (
-                    Permission.objects.order_by("name")
-                    .filter(
-                        role__permissions__id__in=user.roles.values_list(
-                            "pk", flat=True
-                        )
-                    )
-                    .distinct()
-                    .values_list("name", flat=True)
-                )
-            return list(permissions), None
-
         perms, error = self.get_cache_value_or_default(
-            self.gen_cache_key("permission_names", user=user), __do_get_permission_names
+            self.gen_cache_key("permission_names", user=user),
+            lambda: self.__do_get_permission_names(user),
         )
         return perms if not error else []
 
     def get_user_role_names(self, user: User) -> List[str]:
-        def __do_get_role_names() -> Tuple[List[str], None]:
-            roles = user.roles.values_list("name", flat=True)
-            return list(roles), None
-
-        perms, error = self.get_cache_value_or_default(
-            self.gen_cache_key("role_names", user=user), __do_get_role_names
+        roles, error = self.get_cache_value_or_default(
+            self.gen_cache_key("role_names", user=user),
+            lambda: self.__do_get_role_names(user),
         )
-        return perms if not error else []
+        return roles if not error else []
+
+    def get_user_permission_and_role_names(
+        self, user: User
+    ) -> Tuple[List[str], List[str]]:
+        """Both lookups in one cache round-trip, e.g. for login."""
+        permissions_key = self.gen_cache_key("permission_names", user=user)
+        roles_key = self.gen_cache_key("role_names", user=user)
+
+        results = self.get_many_or_default(
+            {
+                permissions_key: lambda: self.__do_get_permission_names(user),
+                roles_key: lambda: self.__do_get_role_names(user),
+            }
+        )
+        perms, perms_error = results[permissions_key]
+        roles, roles_error = results[roles_key]
+
+        return perms if not perms_error else [], roles if not roles_error else []
+
+    @staticmethod
+    def __do_get_permission_names(user: User) -> Tuple[List[str], None]:
+        if (
+            user.is_superuser
+            or user.roles.filter(name__exact=RoleEnum.sysadmin).exists()
+        ):
+            permissions = Permission.objects.values_list("name", flat=True)
+        else:
+            permissions = (
+                Permission.objects.order_by("name")
+                .filter(
+                    role__permissions__id__in=user.roles.values_list("pk", flat=True)
+                )
+                .distinct()
+                .values_list("name", flat=True)
+            )
+        return list(permissions), None
+
+    @staticmethod
+    def __do_get_role_names(user: User) -> Tuple[List[str], None]:
+        roles = user.roles.values_list("name", flat=True)
+        return list(roles), None
 
     @classmethod
     def is_super_user(cls, user: User) -> bool:
@@ -139,7 +177,9 @@ class UserService(CustomAPIRequestUtil):
                 )
 
                 if device_id and device_name:
-                    user.devices.append({"device_id": device_id, "device_name": device_name})
+                    DeviceToken.objects.create(
+                        user=user, device_id=device_id, device_name=device_name
+                    )
 
                 role_ids = payload.get("role_ids", [])
                 if role_ids:
@@ -204,7 +244,6 @@ class UserService(CustomAPIRequestUtil):
         user.user_type = user_type or user.user_type
         user.updated_at = timezone.now()
         user.updated_by = user
-        user.fcm_token = fcm_token or user.fcm_token
         user.update_kyc_required = update_kyc_required or user.update_kyc_required
         user.save(
             update_fields=[
@@ -217,18 +256,19 @@ class UserService(CustomAPIRequestUtil):
                 "registration_complete",
                 "updated_at",
                 "updated_by",
-                "fcm_token",
             ]
         )
+        if fcm_token:
+            DeviceToken.register(user, fcm_token)
 
         if role_ids := payload.get("role_ids"):
             role_service = RoleService(self.request)
             roles = role_service.fetch_by_ids(role_ids)
             user.roles.set(roles)
 
-        self.clear_temp_cache(user)
         self.report_activity(ActivityType.update, user)
         user.save()
+        self.clear_temp_cache(user)
 
         user, error = self.fetch_single_by_username(user.username)
         return user, error
@@ -363,23 +403,78 @@ class UserService(CustomAPIRequestUtil):
         page = self.paginate_queryset(queryset, request=self.request)
         data = UserListSerializer(page, many=True).data
 
-        return self.get_paginated_list_response(data, queryset.count())
+        return self.get_paginated_list_response(data, self.get_paginated_total())
+
+    @classmethod
+    def auth_snapshot_cache_key(cls, user_id) -> str:
+        return cls.generate_cache_key(
+            "user", user_id, "auth_snapshot", cls.AUTH_SNAPSHOT_VERSION
+        )
+
+    @classmethod
+    def load_auth_snapshot(cls, user_id) -> Tuple[Optional[dict], None]:
+        snapshot = (
+            User.objects.filter(pk=user_id)
+            .values(*cls.AUTH_SNAPSHOT_FIELDS, "password")
+            .first()
+        )
+        if snapshot is None:
+            return None, None
+
+        password = snapshot.pop("password")
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            snapshot["revoke_hash"] = get_md5_hash_password(password)
+        snapshot["role_ids"] = list(
+            User.roles.through.objects.filter(user_id=user_id).values_list(
+                "role_id", flat=True
+            )
+        )
+        return snapshot, None
+
+    @classmethod
+    def get_auth_snapshot(cls, user_id) -> Optional[dict]:
+        snapshot, _ = cls.get_cache_value_or_default(
+            cls.auth_snapshot_cache_key(user_id),
+            lambda: cls.load_auth_snapshot(user_id),
+            timeout=settings.AUTH_USER_CACHE_TIMEOUT,
+            negative_timeout=0,
+        )
+        return snapshot
+
+    @classmethod
+    def user_from_auth_snapshot(cls, snapshot: dict) -> User:
+        """A User holding the snapshot's fields; `password` loads on access."""
+        # from_db takes the values in the model's field order
+        field_names = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in cls.AUTH_SNAPSHOT_FIELDS
+        ]
+        user = User.from_db(
+            router.db_for_read(User),
+            field_names,
+            [snapshot[name] for name in field_names],
+        )
+        user._role_ids = snapshot["role_ids"]
+        return user
 
     def clear_temp_cache(self, user):
-        self.clear_cache(self.gen_cache_key("permission_names", user_id=user))
-        self.clear_cache(self.gen_cache_key("role_names", user_id=user))
-        self.clear_cache(self.gen_cache_key("user_id", user_id=user.id))
         self.clear_cache(
-            self.gen_cache_key("user_username", user_id=user.username.lower())
+            self.auth_snapshot_cache_key(user.id),
+            self.gen_cache_key("permission_names", user=user),
+            self.gen_cache_key("role_names", user=user),
+            self.gen_cache_key("user_id", user_id=user.id),
+            self.gen_cache_key("user_username", user_id=user.username.lower()),
+            self.gen_cache_key("user_email", user_id=user.email.lower()),
         )
-        self.clear_cache(self.gen_cache_key("user_email", user_id=user.email.lower()))
 
     @classmethod
     def fetch_fcm_tokens(cls, user_ids):
         return list(
-            User.available_objects.filter(pk__in=user_ids, fcm_token__isnull=False)
-            .distinct()
-            .values_list("fcm_token", flat=True)
+            DeviceToken.objects.filter(
+                user__in=User.available_objects.filter(pk__in=user_ids),
+                token__isnull=False,
+            ).values_list("token", flat=True)
         )
 
     def check_username(self, payload):
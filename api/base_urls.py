@@ -4,5 +4,6 @@ from rest_framework_simplejwt.views import TokenRefreshView
 urlpatterns = [
     path("auth/", include("api.urls.auth")),
     path("courses/", include("api.urls.courses")),
-    path("assignments/", include("api.urls.assignments"))
+    path("assignments/", include("api.urls.assignments")),
+    path("metrics/", include("api.urls.metrics")),
     ]
\ No newline at end of file
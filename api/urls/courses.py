@@ -1,10 +1,13 @@
 from django.urls import path
 from courses.controllers.course import (
     AddLessonAPIView,
+    BulkAddLessonsAPIView,
+    BulkEnrollAPIView,
     CreateCourseAPIView,
     DeleteCourseAPIView,
     DeleteLessonAPIView,
     EnrollCourseAPIView,
+    ExportEnrollmentsAPIView,
     GetCourseDetailAPIView,
     ListCoursesAPIView,
     ListEnrollmentsAPIView,
@@ -20,7 +23,10 @@ urlpatterns = [
     path("courses/<int:pk>/delete", DeleteCourseAPIView.as_view(), name="delete-course"),
     path("courses/<int:pk>/enroll", EnrollCourseAPIView.as_view(), name="enroll-course"),
     path("courses/enrollments", ListEnrollmentsAPIView.as_view(), name="list-enrollments"),
+    path("courses/<int:pk>/enrollments/bulk", BulkEnrollAPIView.as_view(), name="bulk-enroll"),
+    path("courses/<int:pk>/enrollments/export", ExportEnrollmentsAPIView.as_view(), name="export-enrollments"),
     path("courses/<int:pk>/lessons", ListLessonsAPIView.as_view(), name="list-lessons"),
     path("courses/<int:pk>/lessons/add", AddLessonAPIView.as_view(), name="add-lesson"),
+    path("courses/<int:pk>/lessons/bulk", BulkAddLessonsAPIView.as_view(), name="bulk-add-lessons"),
     path("courses/<int:pk>/lessons/<int:lesson_pk>/delete", DeleteLessonAPIView.as_view(), name="delete-lesson"),
 ]
\ No newline at end of file
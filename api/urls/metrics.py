@@ -0,0 +1,6 @@
+from django.urls import path
+from core.controllers.metrics import CacheMetricsAPIView
+
+urlpatterns = [
+    path("cache", CacheMetricsAPIView.as_view(), name="cache-metrics"),
+]
@@ -7,11 +7,14 @@ from drf_spectacular.utils import OpenApiParameter, extend_schema
 
 from assignments.services.assignment_service import AssignmentService
 from assignments.serializers import (
+    BulkGradeSubmissionsSerializer,
     CreateAssignmentSerializer,
     GetAssignmentSerializer,
     UpdateAssignmentSerializer,
     SubmissionSerializer,
 )
+from services.export import EXPORT_FORMAT_PARAMETER
+from services.fieldsets import SPARSE_FIELDSET_PARAMETERS
 from services.util import CustomApiRequestProcessorBase
 
 logger = logging.getLogger(__name__)
@@ -28,13 +31,18 @@ class ListAssignmentsAPIView(APIView, CustomApiRequestProcessorBase):
                 description="ID of the course to list assignments for",
                 required=True,
             ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ],
         responses={200: GetAssignmentSerializer(many=True)},
     )
     def get(self, request, course_id=None):
         service = AssignmentService(request)
-        return self.process_request(
-            request, lambda: service.list_assignments(course_id)
+        return self.process_cached_request(
+            request,
+            lambda: service.list_assignments(course_id),
+            service.list_assignments_cache_key(course_id),
+            timeout=60,
+            validators=lambda: service.list_assignments_validators(course_id),
         )
 
 
@@ -58,8 +66,11 @@ class GetAssignmentDetailAPIView(APIView, CustomApiRequestProcessorBase):
     @extend_schema(tags=["Course-Assignments"])
     def get(self, request, assignment_id=None):
         service = AssignmentService(request)
-        return self.process_request(
-            request, lambda: service.get_assignment_detail(assignment_id)
+        return self.process_cached_request(
+            request,
+            lambda: service.get_assignment_detail(assignment_id),
+            service.assignment_detail_cache_key(assignment_id),
+            timeout=60,
         )
 
 
@@ -89,7 +100,7 @@ class DeleteAssignmentAPIView(APIView, CustomApiRequestProcessorBase):
 
 class ListSubmissionsAPIView(APIView, CustomApiRequestProcessorBase):
     """List all submissions for an assignment (teacher only)."""
-    @extend_schema(tags=["Course-Assignments"])
+    @extend_schema(tags=["Course-Assignments"], parameters=SPARSE_FIELDSET_PARAMETERS)
     def get(self, request, assignment_id=None):
         service = AssignmentService(request)
         return self.process_request(
@@ -97,6 +108,46 @@ class ListSubmissionsAPIView(APIView, CustomApiRequestProcessorBase):
         )
 
 
+class ExportSubmissionsAPIView(APIView, CustomApiRequestProcessorBase):
+    """Stream all submissions for an assignment as NDJSON or CSV (teacher only)."""
+    @extend_schema(tags=["Course-Assignments"], parameters=[EXPORT_FORMAT_PARAMETER])
+    def get(self, request, assignment_id=None):
+        service = AssignmentService(request)
+        return self.process_export_request(
+            request, lambda: service.export_submissions(assignment_id)
+        )
+
+
+class GradebookAPIView(APIView, CustomApiRequestProcessorBase):
+    """A course's students x assignments grade grid (teacher only)."""
+    @extend_schema(tags=["Course-Assignments"])
+    def get(self, request, course_id=None):
+        service = AssignmentService(request)
+        return self.process_request(request, lambda: service.get_gradebook(course_id))
+
+
+class ExportGradebookAPIView(APIView, CustomApiRequestProcessorBase):
+    """Stream a course's gradebook grid as NDJSON or CSV (teacher only)."""
+    @extend_schema(tags=["Course-Assignments"], parameters=[EXPORT_FORMAT_PARAMETER])
+    def get(self, request, course_id=None):
+        service = AssignmentService(request)
+        return self.process_export_request(
+            request, lambda: service.export_gradebook(course_id)
+        )
+
+
+class BulkGradeSubmissionsAPIView(APIView, CustomApiRequestProcessorBase):
+    """Grade a batch of an assignment's submissions (teacher only)."""
+    serializer_class = BulkGradeSubmissionsSerializer
+
+    @extend_schema(tags=["Course-Assignments"])
+    @transaction.atomic
+    @method_decorator(ratelimit(key="user", rate="5/m", block=True))
+    def post(self, request, *args, **kwargs):
+        service = AssignmentService(request)
+        return self.process_request(request, service.grade_submissions, **kwargs)
+
+
 class CreateSubmissionAPIView(APIView, CustomApiRequestProcessorBase):
     serializer_class = SubmissionSerializer
 
@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from courses.models import Course
 from crm.models import BaseModel
 
@@ -46,9 +47,20 @@ class Submission(BaseModel):
     class Meta:
         unique_together = [["assignment", "student"]]
         ordering = ["-submitted_at"]
+        indexes = [
+            # keyset pagination of an assignment's submissions
+            models.Index(
+                fields=["assignment", "-submitted_at", "-id"],
+                name="submission_keyset_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        # Auto-update status to "late" if past due_date
-        if self.submitted_at and self.assignment.due_date < self.submitted_at:
-            self.status = "late"
+        # Mark as "late" if submitted past due_date. Only decided on the
+        # first save, so later saves (e.g. grading) neither reload the
+        # assignment nor overwrite the status.
+        if self._state.adding:
+            submitted_at = self.submitted_at or timezone.now()
+            if self.assignment.due_date < submitted_at:
+                self.status = self.STATUS_LATE
         super().save(*args, **kwargs)
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 
 from assignments.models import Assignment, Submission
+from courses.serializers import BULK_WRITE_MAX_ITEMS
+from services.fieldsets import SparseFieldsetMixin
+from services.values_serializer import ValuesSerializer
 
 
 class CreateAssignmentSerializer(serializers.ModelSerializer):
@@ -15,13 +18,17 @@ class CreateAssignmentSerializer(serializers.ModelSerializer):
         }
 
 
-class GetAssignmentSerializer(serializers.ModelSerializer):
+class GetAssignmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Assignment
         fields = ['id', 'course', 'title', 'description', 'due_date', 'created_at', 'updated_at']
         read_only_fields = fields
 
 
+class GetAssignmentValuesSerializer(ValuesSerializer):
+    serializer_class = GetAssignmentSerializer
+
+
 class UpdateAssignmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Assignment
@@ -33,8 +40,24 @@ class UpdateAssignmentSerializer(serializers.ModelSerializer):
         }
 
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class SubmissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Submission
         fields = ['id', 'assignment', 'student', 'content', 'submitted_at', 'status', 'grade', 'feedback']
-        read_only_fields = ['id', 'student', 'submitted_at', 'status']
\ No newline at end of file
+        read_only_fields = ['id', 'student', 'submitted_at', 'status']
+
+
+class GradeSubmissionItemSerializer(serializers.Serializer):
+    submission = serializers.IntegerField()
+    grade = serializers.DecimalField(max_digits=5, decimal_places=2)
+    feedback = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class BulkGradeSubmissionsSerializer(serializers.Serializer):
+    grades = GradeSubmissionItemSerializer(many=True, allow_empty=False, max_length=BULK_WRITE_MAX_ITEMS)
+
+    def validate_grades(self, value):
+        submissions = [item['submission'] for item in value]
+        if len(submissions) != len(set(submissions)):
+            raise serializers.ValidationError('Each submission can only be graded once per batch.')
+        return value
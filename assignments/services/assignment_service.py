@@ -1,20 +1,41 @@
 import logging
 from typing import Any, Dict, List, Optional, Tuple
 
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+
 from accounts.models import User, UserTypes
 from assignments.models import Assignment, Submission
 from assignments.serializers import (
     CreateAssignmentSerializer,
     GetAssignmentSerializer,
+    GetAssignmentValuesSerializer,
     UpdateAssignmentSerializer,
     SubmissionSerializer,
 )
+from courses.models import Course, Enrollment
 from services.cache_util import CacheUtil
+from services.export import QuerysetExport, RowsExport
 from services.log import AppLogger
-from services.pagination import ServicePaginationMixin
+from services.pagination import CountStrategy, ServicePaginationMixin
+from services.util import get_list_validators, make_background_request
 
 logger = logging.getLogger(__name__)
 
+SUBMISSION_EXPORT_COLUMNS = {
+    "id": "id",
+    "student": "student_id",
+    "student_username": "student__username",
+    "student_full_name": "student__full_name",
+    "submitted_at": "submitted_at",
+    "status": "status",
+    "grade": "grade",
+    "feedback": "feedback",
+    "content": "content",
+}
+
+GRADEBOOK_STUDENT_COLUMNS = ["student", "student_username", "student_full_name"]
+
 
 class AssignmentService(ServicePaginationMixin):
     def __init__(self, request):
@@ -31,12 +52,139 @@ class AssignmentService(ServicePaginationMixin):
             return None, "Only teachers can manage assignments."
         return self.auth_user, None
 
+    # -----------------------------
+    # Cache keys
+    # -----------------------------
+    @staticmethod
+    def assignments_list_namespace(course_id) -> str:
+        """Every cached page of a course's assignment list lives under this."""
+        return CacheUtil.generate_cache_key("assignments_list", course_id)
+
+    def list_assignments_cache_key(self, course_id) -> str:
+        return CacheUtil.generate_namespaced_cache_key(
+            self.assignments_list_namespace(course_id),
+            **self.get_pagination_params(self.request),
+        )
+
+    @staticmethod
+    def assignment_detail_cache_key(pk) -> str:
+        return CacheUtil.generate_cache_key("assignment_detail", pk)
+
+    def list_assignments_validators(self, course_id):
+        return get_list_validators(
+            Assignment.objects.filter(course_id=course_id),
+            self.list_assignments_cache_key(course_id),
+        )
+
+    @staticmethod
+    def gradebook_cache_key(course_id) -> str:
+        return CacheUtil.generate_cache_key("gradebook", course_id)
+
+    @staticmethod
+    def invalidate_gradebook(course_id) -> None:
+        """After any change to the course's submissions, assignments or roster."""
+        CacheUtil.clear_cache(AssignmentService.gradebook_cache_key(course_id))
+
+    def _invalidate_assignment_caches(self, course_id, pk) -> None:
+        # every cached page of the course's list + the detail and its response
+        CacheUtil.bump_namespace(self.assignments_list_namespace(course_id))
+        self.invalidate_gradebook(course_id)
+        detail_key = self.assignment_detail_cache_key(pk)
+        CacheUtil.clear_cache(
+            detail_key, CacheUtil.generate_response_cache_key(detail_key)
+        )
+
+    @staticmethod
+    def _adjust_assignment_count(course_id, delta: int) -> None:
+        # CourseService imports this module
+        from courses.services.course_service import CourseService
+
+        CourseService.adjust_course_counts(course_id, assignment_count=delta)
+
+    # -----------------------------
+    # Cache loaders (also run by the background refresh task)
+    # -----------------------------
+    @staticmethod
+    def load_assignments_page(
+        course_id: str, url: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        service = AssignmentService(make_background_request(url))
+        qs = Assignment.objects.filter(course_id=course_id)
+        return service.paginate(qs, GetAssignmentValuesSerializer, service.request), None
+
+    @staticmethod
+    def load_assignment_detail(
+        pk: str,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        assignment, err = AssignmentService._get_assignment(pk)
+        if err:
+            return None, err
+        return GetAssignmentSerializer(assignment).data, None
+
+    @staticmethod
+    def load_gradebook(course_id) -> Tuple[Dict[str, Any], None]:
+        """
+        The course's students x assignments grid, from two queries: the
+        assignments (the columns), then every enrolled student left-joined
+        to their submissions for those assignments (the rows).
+
+        Columnar: `grades[i][j]` and `statuses[i][j]` are student i's grade
+        and submission status for assignment j, None when not submitted.
+        """
+        assignments = list(
+            Assignment.objects.filter(course_id=course_id)
+            .order_by("due_date", "id")
+            .values("id", "title", "due_date")
+        )
+        column = {assignment["id"]: j for j, assignment in enumerate(assignments)}
+
+        rows = Enrollment.objects.filter(course_id=course_id).order_by(
+            "student__username"
+        )
+        cells = ["student_id", "student__username", "student__full_name"]
+        if column:
+            rows = rows.annotate(
+                course_submission=FilteredRelation(
+                    "student__submissions",
+                    condition=Q(student__submissions__assignment_id__in=list(column)),
+                )
+            )
+            cells += [
+                "course_submission__assignment_id",
+                "course_submission__grade",
+                "course_submission__status",
+            ]
+
+        students, grades, statuses, row_of = [], [], [], {}
+        for student_id, username, full_name, *submission in rows.values_list(*cells):
+            if student_id not in row_of:
+                row_of[student_id] = len(students)
+                students.append(
+                    {"id": student_id, "username": username, "full_name": full_name}
+                )
+                grades.append([None] * len(assignments))
+                statuses.append([None] * len(assignments))
+
+            if submission and submission[0] is not None:
+                assignment_id, grade, status = submission
+                i, j = row_of[student_id], column[assignment_id]
+                grades[i][j] = None if grade is None else str(grade)
+                statuses[i][j] = status
+
+        return {
+            "course": course_id,
+            "assignments": assignments,
+            "students": students,
+            "grades": grades,
+            "statuses": statuses,
+        }, None
+
     @staticmethod
     def _get_assignment(pk: str) -> Tuple[Optional[Assignment], Optional[str]]:
         if not pk:
             return None, "Assignment ID not provided."
         try:
-            return Assignment.objects.get(id=pk), None
+            return Assignment.objects.select_related("course").get(id=pk), None
         except Assignment.DoesNotExist:
             return None, "Assignment not found."
 
@@ -46,11 +194,15 @@ class AssignmentService(ServicePaginationMixin):
     def list_assignments(
         self, course_id: str
     ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-        cache_key = CacheUtil.generate_cache_key("assignments_list", course_id)
+        error = self.get_sparse_fields_error(GetAssignmentSerializer, self.request)
+        if error:
+            return [], error
+
+        cache_key = self.list_assignments_cache_key(course_id)
 
         def loader():
             qs = Assignment.objects.filter(course_id=course_id)
-            data = self.paginate(qs, GetAssignmentSerializer, self.request)
+            data = self.paginate(qs, GetAssignmentValuesSerializer, self.request)
             return data, None
 
         data, error = CacheUtil.get_cache_value_or_default(
@@ -58,6 +210,14 @@ class AssignmentService(ServicePaginationMixin):
             value_callback=loader,
             require_fresh_data=False,
             timeout=300,
+            single_flight=True,
+            early_recompute=True,
+            soft_timeout=60,
+            background_refresh=(
+                "assignments.services.assignment_service:"
+                "AssignmentService.load_assignments_page",
+                {"course_id": course_id, "url": self.request.build_absolute_uri()},
+            ),
         )
         return data or [], error
 
@@ -68,37 +228,40 @@ class AssignmentService(ServicePaginationMixin):
         if error:
             return None, error
 
-        course = validated_data.get("course")
-        if course.teacher.user != teacher:
+        course = Course.objects.filter(id=validated_data.get("course")).first()
+        if not course:
+            return None, "Course not found."
+        if course.teacher_id != teacher.id:
             return None, "Permission denied."
 
         serializer = CreateAssignmentSerializer(data=validated_data)
         serializer.is_valid(raise_exception=True)
         assignment = serializer.save()
+        self._adjust_assignment_count(course.id, 1)
 
-        # invalidate caches for this course
-        CacheUtil.clear_cache(
-            CacheUtil.generate_cache_key("assignments_list", str(course.id))
-        )
+        # invalidate caches for this course (the detail may be cached as "not found")
+        self._invalidate_assignment_caches(course.id, str(assignment.id))
 
         return GetAssignmentSerializer(assignment).data, None
 
     def get_assignment_detail(
         self, pk: str
     ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-        cache_key = CacheUtil.generate_cache_key("assignment_detail", pk)
-
-        def loader():
-            assignment, err = self._get_assignment(pk)
-            if err:
-                return None, err
-            return GetAssignmentSerializer(assignment).data, None
+        cache_key = self.assignment_detail_cache_key(pk)
 
         data, error = CacheUtil.get_cache_value_or_default(
             cache_key,
-            value_callback=loader,
+            value_callback=lambda: self.load_assignment_detail(pk),
             require_fresh_data=False,
             timeout=300,
+            single_flight=True,
+            early_recompute=True,
+            soft_timeout=60,
+            background_refresh=(
+                "assignments.services.assignment_service:"
+                "AssignmentService.load_assignment_detail",
+                {"pk": pk},
+            ),
         )
         return data, error
 
@@ -112,7 +275,7 @@ class AssignmentService(ServicePaginationMixin):
         assignment, error = self._get_assignment(pk)
         if error:
             return None, error
-        if assignment.course.teacher.user != teacher:
+        if assignment.course.teacher_id != teacher.id:
             return None, "Permission denied."
 
         serializer = UpdateAssignmentSerializer(
@@ -122,10 +285,7 @@ class AssignmentService(ServicePaginationMixin):
         updated = serializer.save()
 
         # invalidate both list + detail
-        CacheUtil.clear_cache(
-            CacheUtil.generate_cache_key("assignments_list", str(updated.course.id)),
-            CacheUtil.generate_cache_key("assignment_detail", pk),
-        )
+        self._invalidate_assignment_caches(updated.course_id, pk)
 
         return GetAssignmentSerializer(updated).data, None
 
@@ -139,16 +299,14 @@ class AssignmentService(ServicePaginationMixin):
         assignment, error = self._get_assignment(pk)
         if error:
             return None, error
-        if assignment.course.teacher.user != teacher:
+        if assignment.course.teacher_id != teacher.id:
             return None, "Permission denied."
 
-        course_id = assignment.course.id
+        course_id = assignment.course_id
         assignment.delete()
+        self._adjust_assignment_count(course_id, -1)
 
-        CacheUtil.clear_cache(
-            CacheUtil.generate_cache_key("assignments_list", str(course_id)),
-            CacheUtil.generate_cache_key("assignment_detail", pk),
-        )
+        self._invalidate_assignment_caches(course_id, pk)
 
         return {"message": "Assignment deleted"}, None
 
@@ -159,13 +317,144 @@ class AssignmentService(ServicePaginationMixin):
         self, assignment_id: str
     ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         teacher, error = self._get_teacher()
+        if error:
+            return [], error
+        error = self.get_sparse_fields_error(SubmissionSerializer, self.request)
         if error:
             return [], error
 
         qs = Submission.objects.filter(assignment_id=assignment_id)
-        data = self.paginate(qs, SubmissionSerializer, self.request)
+        data = self.paginate(
+            qs,
+            SubmissionSerializer,
+            self.request,
+            cursor_ordering=("-submitted_at", "-id"),
+            count_strategy=CountStrategy.cached,
+        )
         return data, None
 
+    def export_submissions(
+        self, assignment_id: str
+    ) -> Tuple[Optional[QuerysetExport], Optional[str]]:
+        teacher, error = self._get_teacher()
+        if error:
+            return None, error
+
+        assignment, error = self._get_assignment(assignment_id)
+        if error:
+            return None, error
+        if assignment.course.teacher_id != teacher.id:
+            return None, "Permission denied."
+
+        qs = Submission.objects.filter(assignment=assignment).order_by(
+            "submitted_at", "id"
+        )
+        return (
+            QuerysetExport(
+                qs,
+                SUBMISSION_EXPORT_COLUMNS,
+                f"assignment-{assignment.id}-submissions",
+            ),
+            None,
+        )
+
+    def _get_own_course(self, course_id) -> Tuple[Optional[Course], Optional[str]]:
+        teacher, error = self._get_teacher()
+        if error:
+            return None, error
+
+        course = Course.objects.filter(id=course_id).first()
+        if not course:
+            return None, "Course not found."
+        if course.teacher_id != teacher.id:
+            return None, "Permission denied."
+        return course, None
+
+    def get_gradebook(
+        self, course_id: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        course, error = self._get_own_course(course_id)
+        if error:
+            return None, error
+
+        return CacheUtil.get_cache_value_or_default(
+            self.gradebook_cache_key(course.id),
+            value_callback=lambda: self.load_gradebook(course.id),
+            require_fresh_data=False,
+            timeout=300,
+            single_flight=True,
+        )
+
+    def export_gradebook(
+        self, course_id: str
+    ) -> Tuple[Optional[RowsExport], Optional[str]]:
+        """The gradebook grid, one row per student, one column per assignment."""
+        gradebook, error = self.get_gradebook(course_id)
+        if error:
+            return None, error
+
+        assignment_columns = [
+            f"assignment_{assignment['id']}" for assignment in gradebook["assignments"]
+        ]
+
+        def rows():
+            for student, grades in zip(gradebook["students"], gradebook["grades"]):
+                row = dict(
+                    zip(
+                        GRADEBOOK_STUDENT_COLUMNS,
+                        (student["id"], student["username"], student["full_name"]),
+                    )
+                )
+                row.update(zip(assignment_columns, grades))
+                yield row
+
+        return (
+            RowsExport(
+                rows(),
+                GRADEBOOK_STUDENT_COLUMNS + assignment_columns,
+                f"course-{course_id}-gradebook",
+            ),
+            None,
+        )
+
+    def grade_submissions(
+        self, validated_data: Dict[str, Any], **kwargs
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        teacher, error = self._get_teacher()
+        if error:
+            return None, error
+
+        assignment, error = self._get_assignment(kwargs.get("assignment_id"))
+        if error:
+            return None, error
+        if assignment.course.teacher_id != teacher.id:
+            return None, "Permission denied."
+
+        grades = {item["submission"]: item for item in validated_data["grades"]}
+        submissions = list(
+            Submission.objects.filter(assignment=assignment, id__in=grades)
+        )
+        missing = set(grades) - {submission.id for submission in submissions}
+        if missing:
+            ids = ", ".join(str(pk) for pk in sorted(missing))
+            return None, {"grades": f"Submissions not found for this assignment: {ids}"}
+
+        now = timezone.now()
+        update_fields = ["grade", "status", "updated_at"]
+        for submission in submissions:
+            item = grades[submission.id]
+            submission.grade = item["grade"]
+            submission.status = Submission.STATUS_GRADED
+            submission.updated_at = now
+            if "feedback" in item:
+                submission.feedback = item["feedback"]
+        if any("feedback" in item for item in grades.values()):
+            update_fields.append("feedback")
+
+        Submission.objects.bulk_update(submissions, update_fields)
+        self.invalidate_gradebook(assignment.course_id)
+        return SubmissionSerializer(submissions, many=True).data, None
+
     def create_submission(
         self, assignment_id: str, validated_data: Dict[str, Any]
     ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
@@ -181,6 +470,7 @@ class AssignmentService(ServicePaginationMixin):
         serializer = SubmissionSerializer(data=validated_data)
         serializer.is_valid(raise_exception=True)
         submission = serializer.save()
+        self.invalidate_gradebook(assignment.course_id)
         return SubmissionSerializer(submission).data, None
 
     def get_submission_detail(
@@ -198,7 +488,7 @@ class AssignmentService(ServicePaginationMixin):
         submission = self._get_submission(pk)
         if not submission:
             return None, "Submission not found."
-        if submission.student != user:
+        if submission.student_id != user.id:
             return None, "Permission denied."
 
         serializer = SubmissionSerializer(
@@ -206,6 +496,7 @@ class AssignmentService(ServicePaginationMixin):
         )
         serializer.is_valid(raise_exception=True)
         updated = serializer.save()
+        self.invalidate_gradebook(submission.assignment.course_id)
         return SubmissionSerializer(updated).data, None
 
     def delete_submission(
@@ -215,9 +506,10 @@ class AssignmentService(ServicePaginationMixin):
         submission = self._get_submission(pk)
         if not submission:
             return None, "Submission not found."
-        if submission.student != user:
+        if submission.student_id != user.id:
             return None, "Permission denied."
         submission.delete()
+        self.invalidate_gradebook(submission.assignment.course_id)
         return {"message": "Submission deleted"}, None
 
     # -----------------------------
@@ -227,7 +519,7 @@ class AssignmentService(ServicePaginationMixin):
         if not pk:
             return None
         try:
-            return Submission.objects.get(id=pk)
+            return Submission.objects.select_related("assignment").get(id=pk)
         except Submission.DoesNotExist:
             return None
         except Exception as e:
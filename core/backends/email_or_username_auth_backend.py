@@ -3,7 +3,9 @@ from django.contrib.auth.backends import ModelBackend
 from email_validator import validate_email
 
 from accounts.models import User
+from core.exceptions.custom_exception_handler import ServiceBusyException
 from services.log import AppLogger
+from services.password_hashing import check_password
 
 
 class EmailOrUsernameModelBackend(ModelBackend):
@@ -28,10 +30,12 @@ class EmailOrUsernameModelBackend(ModelBackend):
 
         try:
             user = get_user_model().objects.get(**fields)
-            if user.check_password(password) and self.user_can_authenticate(user):
+            if check_password(user, password) and self.user_can_authenticate(user):
                 return user
         except User.DoesNotExist:
             pass
+        except ServiceBusyException:
+            raise
         except Exception as e:
             AppLogger.report(e)
         return None
@@ -0,0 +1,10 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings.dev")
+
+app = Celery("core")
+# every CELERY_* Django setting, e.g. CELERY_BEAT_SCHEDULE -> beat_schedule
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from drf_spectacular.utils import extend_schema
+from rest_framework.views import APIView
+
+from services.cache_metrics import render_cache_metrics
+from services.util import InvalidAPIKeyForbidden, MissingAPIKeyForbidden
+
+
+class CacheMetricsAPIView(APIView):
+    """Cache metrics for Prometheus, behind the `API-KEY` header."""
+
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        api_key = request.headers.get("API-KEY")
+        if not api_key:
+            raise MissingAPIKeyForbidden()
+
+        if not settings.METRICS_API_KEY or not constant_time_compare(
+            api_key, settings.METRICS_API_KEY
+        ):
+            raise InvalidAPIKeyForbidden()
+
+        return HttpResponse(
+            render_cache_metrics(), content_type="text/plain; version=0.0.4"
+        )
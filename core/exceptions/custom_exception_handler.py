@@ -2,12 +2,15 @@ from django.conf import settings
 from django.utils.translation import gettext as _
 from rest_framework import status
 from rest_framework.exceptions import APIException
-from rest_framework.views import exception_handler
 
 from services.encryption_util import AESCipher
 
 
 def custom_exception_handler(exc, context):
+    # rest_framework.views loads the authentication classes, which import
+    # the exceptions below
+    from rest_framework.views import exception_handler
+
     response = exception_handler(exc, context)
 
     if response is not None:
@@ -33,3 +36,15 @@ def custom_exception_handler(exc, context):
 class RateLimitException(APIException):
     status_code = status.HTTP_429_TOO_MANY_REQUESTS
     default_detail = _("too.many.request")
+
+
+class ServiceBusyException(APIException):
+    """503 with a Retry-After header of `wait` seconds."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("service.busy")
+    default_code = "service_busy"
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        self.wait = wait
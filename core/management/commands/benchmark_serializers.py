@@ -0,0 +1,151 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User, UserTypes
+from assignments.models import Assignment
+from assignments.serializers import (
+    GetAssignmentSerializer,
+    GetAssignmentValuesSerializer,
+)
+from courses.models import Course, Enrollment
+from courses.serializers import (
+    EnrollmentSerializer,
+    EnrollmentValuesSerializer,
+    GetCourseSerializer,
+    GetCourseValuesSerializer,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the ModelSerializers of the hot list endpoints against their "
+        "values()-based fast paths on generated rows, which are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10000,
+            help="Rows generated per model.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per serializer; the fastest is reported.",
+        )
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+
+        try:
+            with transaction.atomic():
+                course_qs, assignment_qs, enrollment_qs = self.generate_rows(rows)
+                cases = [
+                    (
+                        "courses",
+                        course_qs,
+                        GetCourseSerializer,
+                        GetCourseValuesSerializer,
+                    ),
+                    (
+                        "assignments",
+                        assignment_qs,
+                        GetAssignmentSerializer,
+                        GetAssignmentValuesSerializer,
+                    ),
+                    (
+                        "enrollments",
+                        enrollment_qs,
+                        EnrollmentSerializer,
+                        EnrollmentValuesSerializer,
+                    ),
+                ]
+                for name, queryset, serializer, values_serializer in cases:
+                    self.compare(name, queryset, serializer, values_serializer, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def compare(self, name, queryset, serializer, values_serializer, repeat):
+        def model_serializer():
+            return serializer(list(queryset), many=True).data
+
+        def fast_path():
+            values = values_serializer.get_values_queryset(queryset)
+            return values_serializer(list(values), many=True).data
+
+        if model_serializer() != fast_path():
+            self.stderr.write(self.style.ERROR(f"{name}: outputs differ"))
+            return
+
+        slow = self.best_of(model_serializer, repeat)
+        fast = self.best_of(fast_path, repeat)
+        self.stdout.write(
+            f"{name:<12} ModelSerializer {slow * 1000:8.1f} ms   "
+            f"values() {fast * 1000:8.1f} ms   {slow / fast:5.1f}x"
+        )
+
+    @staticmethod
+    def best_of(function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    @staticmethod
+    def generate_rows(rows):
+        tag = uuid.uuid4().hex[:8]
+        teacher = User.objects.create(
+            username=f"bench-teacher-{tag}",
+            email=f"bench-teacher-{tag}@example.com",
+            user_type=UserTypes.teacher,
+        )
+        students = User.objects.bulk_create(
+            User(
+                username=f"bench-{tag}-{i}",
+                email=f"bench-{tag}-{i}@example.com",
+                user_type=UserTypes.student,
+            )
+            for i in range(rows)
+        )
+        courses = Course.objects.bulk_create(
+            Course(
+                title=f"Course {i}",
+                slug=f"bench-{tag}-{i}",
+                description="Lorem ipsum " * 50,
+                teacher=teacher,
+                is_published=True,
+            )
+            for i in range(rows)
+        )
+        course = courses[0]
+        Assignment.objects.bulk_create(
+            Assignment(
+                course=course,
+                title=f"Assignment {i}",
+                description="Lorem ipsum " * 50,
+                due_date=timezone.now(),
+            )
+            for i in range(rows)
+        )
+        Enrollment.objects.bulk_create(
+            Enrollment(student=student, course=course) for student in students
+        )
+
+        return (
+            Course.objects.filter(teacher=teacher),
+            Assignment.objects.filter(course=course),
+            Enrollment.objects.filter(course=course),
+        )
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from assignments.models import Assignment
+from courses.models import Course, Enrollment, Lesson
+from courses.services.course_service import PUBLISHED_COURSES_NAMESPACE, CourseService
+from services.cache_util import CacheUtil
+
+# counter column -> model whose rows it counts
+COUNTED_MODELS = {
+    "enrollment_count": Enrollment,
+    "lesson_count": Lesson,
+    "assignment_count": Assignment,
+}
+
+
+def count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(course=OuterRef("pk"))
+            .order_by()
+            .values("course")
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts each course's enrollments, lessons and assignments and "
+        "repairs the denormalized counters that have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Courses checked per query.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        actual = {
+            f"actual_{column}": count_subquery(model)
+            for column, model in COUNTED_MODELS.items()
+        }
+
+        checked = repaired = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Course.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+
+            drifted = list(
+                Course.objects.filter(id__in=ids)
+                .annotate(**actual)
+                .filter(self.drift_filter())
+                .values_list("id", flat=True)
+            )
+            if not drifted:
+                continue
+
+            Course.objects.filter(id__in=drifted).update(
+                updated_at=timezone.now(),
+                **{
+                    column: count_subquery(model)
+                    for column, model in COUNTED_MODELS.items()
+                },
+            )
+            for pk in drifted:
+                CourseService._invalidate_course_detail(str(pk))
+            repaired += len(drifted)
+
+        if repaired:
+            CacheUtil.bump_namespace(PUBLISHED_COURSES_NAMESPACE)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} course(s), repaired {repaired} with drifted counters."
+            )
+        )
+
+    @staticmethod
+    def drift_filter() -> Q:
+        drift = Q()
+        for column in COUNTED_MODELS:
+            drift |= ~Q(**{column: F(f"actual_{column}")})
+        return drift
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from services.cache_warmer import CacheWarmer
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-populates the published course list, the most recently active "
+        "courses and the permissions of recently logged-in users in the cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--courses",
+            type=int,
+            default=settings.CACHE_WARM_COURSES,
+            help="How many of the most recently active courses to warm.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=settings.CACHE_WARM_USERS,
+            help="How many of the most recently logged-in users to warm.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.CACHE_WARM_CONCURRENCY,
+            help="Maximum number of keys loaded in parallel.",
+        )
+
+    def handle(self, *args, **options):
+        warmer = CacheWarmer(
+            courses=options["courses"],
+            users=options["users"],
+            concurrency=options["concurrency"],
+        )
+        results = warmer.warm()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Warmed {warmed} cache entries ({failed} failed).".format(**results)
+            )
+        )
@@ -0,0 +1,52 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from services.log import AppLogger
+
+
+class TooManyQueriesError(Exception):
+    pass
+
+
+class QueryCountMiddleware:
+    """
+    Development guard against N+1 regressions: counts the queries each
+    request runs on every database and logs, or with QUERY_COUNT_RAISE
+    raises TooManyQueriesError, once a request runs more than
+    QUERY_COUNT_LIMIT (0 disables the check).
+
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        limit = settings.QUERY_COUNT_LIMIT
+        if not limit:
+            return self.get_response(request)
+
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            response = self.get_response(request)
+
+        if len(queries) > limit:
+            message = (
+                f"{request.method} {request.path} ran {len(queries)} queries "
+                f"(limit {limit})"
+            )
+            if settings.QUERY_COUNT_RAISE:
+                raise TooManyQueriesError(message)
+            AppLogger.warning(message)
+
+        response["X-Query-Count"] = str(len(queries))
+        return response
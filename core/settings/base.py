@@ -135,6 +135,51 @@ CACHES = {
     }
 }
 
+# Optional per-worker L1 in front of Redis for hot, rarely changing keys.
+# Invalidations are fanned out to every worker over Redis pub/sub.
+CACHE_L1_ENABLED = os.getenv("CACHE_L1_ENABLED", "False").lower() == "true"
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", 1000))
+CACHE_L1_TIMEOUT = int(os.getenv("CACHE_L1_TIMEOUT", 60))
+CACHE_L1_KEY_FAMILIES = [
+    "course_detail",
+    "assignment_detail",
+    "role_id",
+    "user",
+    "user_email",
+    "user_id",
+    "user_username",
+]
+
+# Single-flight loading of expired keys and XFetch early recomputation.
+CACHE_LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", 10))
+CACHE_LOCK_WAIT = float(os.getenv("CACHE_LOCK_WAIT", 1.0))
+CACHE_LOCK_POLL_INTERVAL = 0.05
+CACHE_XFETCH_BETA = float(os.getenv("CACHE_XFETCH_BETA", 1.0))
+
+# How long a queued stale-while-revalidate refresh blocks duplicate ones.
+CACHE_REFRESH_LOCK_TIMEOUT = int(os.getenv("CACHE_REFRESH_LOCK_TIMEOUT", 60))
+
+# Not-found and error results are cached too, but only briefly.
+CACHE_NEGATIVE_TIMEOUT = int(os.getenv("CACHE_NEGATIVE_TIMEOUT", 60))
+
+# Values whose pickle is at least this many bytes are zlib-compressed in
+# Redis (0 disables compression).
+CACHE_COMPRESS_MIN_SIZE = int(os.getenv("CACHE_COMPRESS_MIN_SIZE", 1024))
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", 6))
+
+# Per key-family cache metrics: workers add their counters to the shared
+# totals at most this often; the metrics endpoint requires METRICS_API_KEY.
+CACHE_METRICS_PUBLISH_INTERVAL = int(os.getenv("CACHE_METRICS_PUBLISH_INTERVAL", 10))
+METRICS_API_KEY = os.getenv("METRICS_API_KEY")
+
+# Cache warm-up (`manage.py warm_cache`, or the beat job below when
+# CACHE_WARM_INTERVAL is set, in seconds).
+CACHE_WARM_BASE_URL = os.getenv("CACHE_WARM_BASE_URL", "http://localhost:8000")
+CACHE_WARM_COURSES = int(os.getenv("CACHE_WARM_COURSES", 50))
+CACHE_WARM_USERS = int(os.getenv("CACHE_WARM_USERS", 200))
+CACHE_WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", 4))
+CACHE_WARM_INTERVAL = int(os.getenv("CACHE_WARM_INTERVAL", 0))
+
 CELERY_BROKER_URL = BROKER_URL
 CELERY_RESULT_BACKEND = BROKER_URL
 CELERY_BACKEND_URL = BROKER_URL
@@ -142,7 +187,13 @@ CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
-CELERY_DEFAULT_QUEUE = "edutrack"
+CELERY_TASK_DEFAULT_QUEUE = "edutrack"
+CELERY_BEAT_SCHEDULE = {}
+if CACHE_WARM_INTERVAL:
+    CELERY_BEAT_SCHEDULE["warm-cache"] = {
+        "task": "core.tasks.warm_cache_queue",
+        "schedule": CACHE_WARM_INTERVAL,
+    }
 
 APP_ENC_KEY = os.getenv("APP_ENC_KEY")
 APP_ENC_VEC = os.getenv("APP_ENC_VEC")
@@ -151,7 +202,7 @@ APP_ENC_ENABLED = (os.getenv("APP_ENC_ENABLED") or "True").lower() == "true"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.backends.cached_jwt_authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
@@ -167,6 +218,51 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 20,
 }
 
+# Totals for paginated lists (see services.pagination.CountStrategy).
+PAGINATION_COUNT_CACHE_TIMEOUT = int(os.getenv("PAGINATION_COUNT_CACHE_TIMEOUT", 30))
+PAGINATION_COUNT_ESTIMATE_MIN = int(os.getenv("PAGINATION_COUNT_ESTIMATE_MIN", 100000))
+
+# Per-request query budget checked by core.middleware.QueryCountMiddleware
+# (installed in dev settings); QUERY_COUNT_LIMIT=0 disables it.
+QUERY_COUNT_LIMIT = int(os.getenv("QUERY_COUNT_LIMIT", 30))
+QUERY_COUNT_RAISE = (os.getenv("QUERY_COUNT_RAISE") or "False").lower() == "true"
+
+# Rows fetched per round trip by streaming exports (services.export).
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# One-time passwords (services.otp): stored as an HMAC keyed with
+# OTP_HMAC_KEY (SECRET_KEY when unset); brute force is stopped by the
+# attempt limit, not by hashing cost.
+OTP_HMAC_KEY = os.getenv("OTP_HMAC_KEY") or None
+OTP_TTL_MINUTES = int(os.getenv("OTP_TTL_MINUTES", 10))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+
+# Seconds an authenticated user's snapshot is cached between requests
+# (core.backends.cached_jwt_authentication).
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 300))
+
+# Failed logins allowed per username and per client IP within
+# LOGIN_THROTTLE_WINDOW seconds (services.throttle).
+LOGIN_THROTTLE_WINDOW = int(os.getenv("LOGIN_THROTTLE_WINDOW", 1200))
+LOGIN_THROTTLE_USER_FAILURES = int(os.getenv("LOGIN_THROTTLE_USER_FAILURES", 10))
+LOGIN_THROTTLE_IP_FAILURES = int(os.getenv("LOGIN_THROTTLE_IP_FAILURES", 50))
+
+# Reverse proxies in front of the app that append to X-Forwarded-For; the
+# client IP used for throttling is read that many entries from its right.
+# 0 uses REMOTE_ADDR (and ignores the header, which clients can forge).
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", 0))
+
+# Per-process pool password hashing runs on (services.password_hashing);
+# requests beyond workers + queue get 503 with Retry-After.
+# Each waiting hash holds a request thread, so workers + queue is capped at
+# GUNICORN_THREADS - 1: one thread per process always stays free for
+# everything that is not a login or signup.
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", 4))
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 2))
+PASSWORD_HASHING_QUEUE = int(os.getenv("PASSWORD_HASHING_QUEUE", 1))
+PASSWORD_HASHING_TIMEOUT = float(os.getenv("PASSWORD_HASHING_TIMEOUT", 5))
+PASSWORD_HASHING_RETRY_AFTER = int(os.getenv("PASSWORD_HASHING_RETRY_AFTER", 2))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
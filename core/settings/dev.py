@@ -4,6 +4,8 @@ DEBUG = True
 
 ALLOWED_HOSTS = ["*"]
 
+MIDDLEWARE += ["core.middleware.QueryCountMiddleware"]
+
 CSRF_COOKIE_SECURE = False
 CSRF_COOKIE_HTTPONLY = False
 SESSION_COOKIE_SECURE = False
@@ -0,0 +1,18 @@
+from celery import app
+
+from services.cache_util import CacheUtil
+from services.cache_warmer import CacheWarmer
+
+
+@app.shared_task
+def refresh_cache_value_queue(
+    cache_key, loader_path, loader_kwargs=None, timeout=None, soft_timeout=None
+):
+    CacheUtil.refresh_cache_value(
+        cache_key, loader_path, loader_kwargs, timeout, soft_timeout
+    )
+
+
+@app.shared_task
+def warm_cache_queue():
+    return CacheWarmer().warm()
@@ -3,8 +3,11 @@ from rest_framework.views import APIView
 from django.db import transaction
 from courses.services.course_service import CourseService
 from courses.serializers import (
-    CreateCourseSerializer, GetCourseSerializer, LessonSerializer, UpdateCourseSerializer
+    BulkEnrollmentSerializer, BulkLessonSerializer, CreateCourseSerializer,
+    GetCourseSerializer, LessonSerializer, UpdateCourseSerializer
 )
+from services.export import EXPORT_FORMAT_PARAMETER
+from services.fieldsets import SPARSE_FIELDSET_PARAMETERS
 from services.util import CustomApiRequestProcessorBase
 import logging
 
@@ -17,11 +20,14 @@ class ListCoursesAPIView(APIView, CustomApiRequestProcessorBase):
     @extend_schema(
             operation_id="listCourses",
             tags=["Courses"],
+            parameters=SPARSE_FIELDSET_PARAMETERS,
             responses={200: GetCourseSerializer(many=True)},
             )
     def get(self, request):
         service = CourseService(request)
-        return self.process_request(request, service.list_courses)
+        return self.process_cached_request(
+            request, service.list_courses, service.list_courses_cache_key(), timeout=300
+        )
 
 class CreateCourseAPIView(APIView, CustomApiRequestProcessorBase):
     serializer_class = CreateCourseSerializer
@@ -40,7 +46,13 @@ class GetCourseDetailAPIView(APIView, CustomApiRequestProcessorBase):
             )
     def get(self, request, pk=None):
         service = CourseService(request)
-        return self.process_request(request, lambda: service.get_course_detail(pk))
+        return self.process_cached_request(
+            request,
+            lambda: service.get_course_detail(pk),
+            service.course_detail_cache_key(pk),
+            timeout=60,
+            validators=lambda: service.course_detail_validators(pk),
+        )
 
 class UpdateCourseAPIView(APIView, CustomApiRequestProcessorBase):
     serializer_class = UpdateCourseSerializer
@@ -65,19 +77,44 @@ class EnrollCourseAPIView(APIView, CustomApiRequestProcessorBase):
         service = CourseService(request)
         return self.process_request(request, lambda: service.enroll(pk))
 
+class BulkEnrollAPIView(APIView, CustomApiRequestProcessorBase):
+    """Enroll a batch of students in a course (teacher only)."""
+    serializer_class = BulkEnrollmentSerializer
+
+    @extend_schema(tags=["Courses"])
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        service = CourseService(request)
+        return self.process_request(request, service.enroll_students, **kwargs)
+
 class ListEnrollmentsAPIView(APIView, CustomApiRequestProcessorBase):
     
-    @extend_schema(tags=["Courses"])    
+    @extend_schema(tags=["Courses"], parameters=SPARSE_FIELDSET_PARAMETERS)
     def get(self, request):
         service = CourseService(request)
         return self.process_request(request, service.list_enrollments)
 
+class ExportEnrollmentsAPIView(APIView, CustomApiRequestProcessorBase):
+    """Stream a course's enrollments as NDJSON or CSV (teacher only)."""
+    @extend_schema(tags=["Courses"], parameters=[EXPORT_FORMAT_PARAMETER])
+    def get(self, request, pk=None):
+        service = CourseService(request)
+        return self.process_export_request(
+            request, lambda: service.export_enrollments(pk)
+        )
+
 class ListLessonsAPIView(APIView, CustomApiRequestProcessorBase):
 
-    @extend_schema(tags=["Courses"])    
+    @extend_schema(tags=["Courses"], parameters=SPARSE_FIELDSET_PARAMETERS)
     def get(self, request, pk=None):
         service = CourseService(request)
-        return self.process_request(request, lambda: service.list_lessons(pk))
+        return self.process_cached_request(
+            request,
+            lambda: service.list_lessons(pk),
+            service.list_lessons_cache_key(pk),
+            timeout=300,
+            validators=lambda: service.list_lessons_validators(pk),
+        )
 
 class AddLessonAPIView(APIView, CustomApiRequestProcessorBase):
     serializer_class = LessonSerializer
@@ -89,6 +126,16 @@ class AddLessonAPIView(APIView, CustomApiRequestProcessorBase):
         service = CourseService(request)
         return self.process_request(request, service.add_lesson, **kwargs)
 
+class BulkAddLessonsAPIView(APIView, CustomApiRequestProcessorBase):
+    """Add a batch of lessons to a course in one transaction."""
+    serializer_class = BulkLessonSerializer
+
+    @extend_schema(tags=["Courses"])
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        service = CourseService(request)
+        return self.process_request(request, service.add_lessons, **kwargs)
+
 class DeleteLessonAPIView(APIView, CustomApiRequestProcessorBase):
     
     @extend_schema(tags=["Courses"])    
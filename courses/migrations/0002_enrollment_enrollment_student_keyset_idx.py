@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("courses", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["student", "-enrolled_at", "-id"],
+                name="enrollment_student_keyset_idx",
+            ),
+        ),
+    ]
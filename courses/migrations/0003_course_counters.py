@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:43
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, course_field="course"):
+    return Coalesce(
+        Subquery(
+            model._base_manager.filter(**{course_field: OuterRef("pk")})
+            .order_by()
+            .values(course_field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def populate_counters(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    Course._base_manager.update(
+        enrollment_count=count_of(apps.get_model("courses", "Enrollment")),
+        lesson_count=count_of(apps.get_model("courses", "Lesson")),
+        assignment_count=count_of(apps.get_model("assignments", "Assignment")),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("courses", "0002_enrollment_enrollment_student_keyset_idx"),
+        ("assignments", "0002_submission_submission_keyset_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="assignment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="enrollment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="lesson_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
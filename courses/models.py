@@ -1,7 +1,10 @@
 # apps/courses/models.py
 
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.conf import settings
+from django.utils import timezone
 from crm.models import BaseModel
 
 
@@ -13,6 +16,11 @@ class Course(BaseModel):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="courses"
     )
     is_published = models.BooleanField(default=False)
+    # Kept current by the services with F() increments; repaired by
+    # `manage.py reconcile_course_counters`.
+    enrollment_count = models.PositiveIntegerField(default=0)
+    lesson_count = models.PositiveIntegerField(default=0)
+    assignment_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["-created_at"]
@@ -20,6 +28,17 @@ class Course(BaseModel):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def adjust_counts(cls, course_id, **deltas):
+        """
+        Atomically adds each delta (e.g. `lesson_count=-1`) to the course's
+        counter columns. updated_at moves too, so validators change.
+        """
+        cls.objects.filter(id=course_id).update(
+            updated_at=timezone.now(),
+            **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()},
+        )
+
 
 class Lesson(BaseModel):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="lessons")
@@ -48,6 +67,13 @@ class Enrollment(models.Model):
     class Meta:
         unique_together = [["student", "course"]]
         ordering = ["-enrolled_at"]
+        indexes = [
+            # keyset pagination of a student's enrollments
+            models.Index(
+                fields=["student", "-enrolled_at", "-id"],
+                name="enrollment_student_keyset_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student.username} enrolled in {self.course.title}"
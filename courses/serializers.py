@@ -1,6 +1,10 @@
 from rest_framework import serializers
 
 from courses.models import Course, Lesson, Enrollment
+from services.fieldsets import SparseFieldsetMixin
+from services.values_serializer import ValuesSerializer
+
+BULK_WRITE_MAX_ITEMS = 500
 
 
 class CreateCourseSerializer(serializers.ModelSerializer):
@@ -19,13 +23,20 @@ class CreateCourseSerializer(serializers.ModelSerializer):
         return value
 
 
-class GetCourseSerializer(serializers.ModelSerializer):
+class GetCourseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
-        fields = ['id', 'title', 'slug', 'description', 'teacher', 'is_published', 'created_at', 'updated_at']
+        fields = [
+            'id', 'title', 'slug', 'description', 'teacher', 'is_published',
+            'enrollment_count', 'lesson_count', 'assignment_count', 'created_at', 'updated_at',
+        ]
         read_only_fields = fields
 
 
+class GetCourseValuesSerializer(ValuesSerializer):
+    serializer_class = GetCourseSerializer
+
+
 class UpdateCourseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
@@ -37,7 +48,7 @@ class UpdateCourseSerializer(serializers.ModelSerializer):
         }
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Lesson
         fields = ['id', 'course', 'title', 'content', 'order', 'video_url', 'created_at']
@@ -51,8 +62,38 @@ class LessonSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class BulkLessonItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = ['title', 'content', 'order', 'video_url']
+
+
+class BulkLessonSerializer(serializers.Serializer):
+    lessons = BulkLessonItemSerializer(many=True, allow_empty=False, max_length=BULK_WRITE_MAX_ITEMS)
+
+    def validate_lessons(self, value):
+        # orders already used in the course are checked with one query by the service
+        orders = [lesson['order'] for lesson in value]
+        if len(orders) != len(set(orders)):
+            raise serializers.ValidationError('Lesson orders must be unique within the batch.')
+        return value
+
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    students = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=BULK_WRITE_MAX_ITEMS
+    )
+
+    def validate_students(self, value):
+        return list(dict.fromkeys(value))
+
+
+class EnrollmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Enrollment
         fields = ['id', 'student', 'course', 'enrolled_at']
         read_only_fields = ['id', 'student', 'enrolled_at']
+
+
+class EnrollmentValuesSerializer(ValuesSerializer):
+    serializer_class = EnrollmentSerializer
@@ -2,21 +2,38 @@ import logging
 from typing import Any, Dict, List, Optional, Tuple
 
 from django.core.cache import cache
+from django.db import IntegrityError, transaction
 
 from accounts.models import User, UserTypes
+from assignments.services.assignment_service import AssignmentService
 from courses.models import Course, Lesson, Enrollment
 from courses.serializers import (
     CreateCourseSerializer,
     GetCourseSerializer,
+    GetCourseValuesSerializer,
     UpdateCourseSerializer,
     LessonSerializer,
     EnrollmentSerializer,
+    EnrollmentValuesSerializer,
 )
 from services.cache_util import CacheUtil
-from services.pagination import ServicePaginationMixin
+from services.export import QuerysetExport
+from services.pagination import CountStrategy, ServicePaginationMixin
+from services.util import get_list_validators
 
 logger = logging.getLogger(__name__)
 
+PUBLISHED_COURSES_NAMESPACE = "published_courses_list"
+
+ENROLLMENT_EXPORT_COLUMNS = {
+    "id": "id",
+    "student": "student_id",
+    "student_username": "student__username",
+    "student_full_name": "student__full_name",
+    "student_email": "student__email",
+    "enrolled_at": "enrolled_at",
+}
+
 
 class CourseService(ServicePaginationMixin):
     def __init__(self, request):
@@ -33,6 +50,14 @@ class CourseService(ServicePaginationMixin):
             return None, "Only teachers can manage courses."
         return self.auth_user, None
 
+    @staticmethod
+    def load_course_detail(pk: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        # also run by the background cache refresh task
+        course, err = CourseService._get_course(pk)
+        if err:
+            return None, err
+        return GetCourseSerializer(course).data, None
+
     @staticmethod
     def _get_course(pk: str) -> Tuple[Optional[Course], Optional[str]]:
         if not pk:
@@ -42,14 +67,89 @@ class CourseService(ServicePaginationMixin):
         except Course.DoesNotExist:
             return None, "Course not found."
 
+    @staticmethod
+    def _lock_course(pk) -> None:
+        # row lock held until the surrounding transaction ends
+        Course.objects.select_for_update().filter(id=pk).values_list("id").first()
+
+    # ------------------------------------
+    # Cache keys
+    # ------------------------------------
+    def list_courses_cache_key(self) -> str:
+        return CacheUtil.generate_namespaced_cache_key(
+            PUBLISHED_COURSES_NAMESPACE, **self.get_pagination_params(self.request)
+        )
+
+    @staticmethod
+    def course_detail_cache_key(pk: str) -> str:
+        return CacheUtil.generate_cache_key("course_detail", pk)
+
+    @staticmethod
+    def lessons_list_namespace(course_pk: str) -> str:
+        return CacheUtil.generate_cache_key("lessons_list", course_pk)
+
+    def list_lessons_cache_key(self, course_pk: str) -> str:
+        return CacheUtil.generate_namespaced_cache_key(
+            self.lessons_list_namespace(course_pk),
+            **self.get_pagination_params(self.request),
+        )
+
+    # ------------------------------------
+    # Conditional GET validators
+    # ------------------------------------
+    def course_detail_validators(self, pk: str):
+        return get_list_validators(
+            Course.objects.filter(id=pk),
+            self.course_detail_cache_key(pk),
+            last_modified=True,
+        )
+
+    def list_lessons_validators(self, course_pk: str):
+        return get_list_validators(
+            Lesson.objects.filter(course_id=course_pk),
+            self.list_lessons_cache_key(course_pk),
+        )
+
+    @staticmethod
+    def _invalidate_course_caches(pk: str) -> None:
+        # every cached page of the list + the detail and its rendered response,
+        # and the lesson pages, which may hold a negative "Course not found."
+        CacheUtil.bump_namespace(
+            PUBLISHED_COURSES_NAMESPACE, CourseService.lessons_list_namespace(pk)
+        )
+        CourseService._invalidate_course_detail(pk)
+
+    @staticmethod
+    def _invalidate_course_detail(pk: str) -> None:
+        detail_key = CourseService.course_detail_cache_key(pk)
+        CacheUtil.clear_cache(
+            detail_key, CacheUtil.generate_response_cache_key(detail_key)
+        )
+
+    @staticmethod
+    def adjust_course_counts(course_id, **deltas) -> None:
+        """
+        Applies counter deltas, e.g. `lesson_count=1`, and drops the cached
+        course. The published list is left alone: a bump on every
+        enrollment would empty it on busy courses, so its counters lag by
+        at most the list's cache timeout.
+        """
+        Course.adjust_counts(course_id, **deltas)
+        CourseService._invalidate_course_detail(str(course_id))
+
     # ------------------------------------
     # Course methods
     # ------------------------------------
-    def list_courses(self) -> Tuple[List[Dict[str, Any]], None]:
-        cache_key = CacheUtil.generate_cache_key("published_courses_list")
+    def list_courses(self) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, str]]]:
+        error = self.get_sparse_fields_error(GetCourseSerializer, self.request)
+        if error:
+            return [], error
+
+        cache_key = self.list_courses_cache_key()
+
         def loader():
             qs = Course.objects.filter(is_published=True)
-            data = self.paginate(qs, GetCourseSerializer, self.request)
+            data = self.paginate(qs, GetCourseValuesSerializer, self.request)
             return data, None
 
         data, _ = CacheUtil.get_cache_value_or_default(
@@ -57,6 +157,8 @@ class CourseService(ServicePaginationMixin):
             value_callback=loader,
             require_fresh_data=False,
             timeout=300,
+            single_flight=True,
+            early_recompute=True,
         )
         return data or [], None
 
@@ -70,27 +172,25 @@ class CourseService(ServicePaginationMixin):
         course = serializer.save(teacher=teacher)
 
         # invalidate list + detail caches
-        CacheUtil.clear_cache(
-            CacheUtil.generate_cache_key("published_courses_list"),
-            CacheUtil.generate_cache_key("course_detail", str(course.id))
-        )
+        self._invalidate_course_caches(str(course.id))
 
         return GetCourseSerializer(course).data, None
 
     def get_course_detail(self, pk: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-        cache_key = CacheUtil.generate_cache_key("course_detail", pk)
-
-        def loader():
-            course, err = self._get_course(pk)
-            if err:
-                return None, err
-            return GetCourseSerializer(course).data, None
+        cache_key = self.course_detail_cache_key(pk)
 
         data, error = CacheUtil.get_cache_value_or_default(
             cache_key,
-            value_callback=loader,
+            value_callback=lambda: self.load_course_detail(pk),
             require_fresh_data=False,
             timeout=300,
+            single_flight=True,
+            early_recompute=True,
+            soft_timeout=60,
+            background_refresh=(
+                "courses.services.course_service:CourseService.load_course_detail",
+                {"pk": pk},
+            ),
         )
         return data, error
 
@@ -109,7 +209,7 @@ class CourseService(ServicePaginationMixin):
         course, error = self._get_course(pk)
         if error:
             return None, error
-        if course.teacher != teacher:
+        if course.teacher_id != teacher.id:
             return None, "Permission denied."
 
         serializer = UpdateCourseSerializer(course, data=validated_data, partial=True)
@@ -117,10 +217,7 @@ class CourseService(ServicePaginationMixin):
         updated = serializer.save()
 
         # invalidate caches
-        CacheUtil.clear_cache(
-            CacheUtil.generate_cache_key("published_courses_list"),
-            CacheUtil.generate_cache_key("course_detail", pk)
-        )
+        self._invalidate_course_caches(pk)
 
         return GetCourseSerializer(updated).data, None
 
@@ -132,16 +229,14 @@ class CourseService(ServicePaginationMixin):
         course, error = self._get_course(pk)
         if error:
             return None, error
-        if course.teacher != teacher:
+        if course.teacher_id != teacher.id:
             return None, "Permission denied."
 
         course.delete()
 
         # invalidate caches
-        CacheUtil.clear_cache(
-            CacheUtil.generate_cache_key("published_courses_list"),
-            CacheUtil.generate_cache_key("course_detail", pk)
-        )
+        self._invalidate_course_caches(pk)
+        CacheUtil.bump_namespace(self.lessons_list_namespace(pk))
 
         return {"message": "Course deleted successfully."}, None
 
@@ -157,31 +252,130 @@ class CourseService(ServicePaginationMixin):
         if student.user_type != UserTypes.student:
             return None, "Only students can enroll."
 
-        enrollment, _ = Enrollment.objects.get_or_create(student=student, course=course)
+        with transaction.atomic():
+            self._lock_course(course.id)
+            enrollment, created = Enrollment.objects.get_or_create(
+                student=student, course=course
+            )
+        if created:
+            self.adjust_course_counts(course.id, enrollment_count=1)
+            AssignmentService.invalidate_gradebook(course.id)
         return EnrollmentSerializer(enrollment).data, None
 
-    def list_enrollments(self) -> Tuple[List[Dict[str, Any]], None]:
+    def enroll_students(
+        self, validated_data: Dict[str, Any], **kwargs
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        teacher, error = self._get_teacher()
+        if error:
+            return None, error
+
+        course, error = self._get_course(kwargs.get("pk"))
+        if error:
+            return None, error
+        if course.teacher_id != teacher.id:
+            return None, "Permission denied."
+
+        student_ids = validated_data["students"]
+        students = set(
+            User.objects.filter(
+                id__in=student_ids, user_type=UserTypes.student
+            ).values_list("id", flat=True)
+        )
+        unknown = [str(pk) for pk in student_ids if pk not in students]
+        if unknown:
+            return None, {"students": f"Not students: {', '.join(unknown)}"}
+
+        enrollments = Enrollment.objects.filter(
+            course=course, student_id__in=student_ids
+        )
+        with transaction.atomic():
+            # serializes with enroll(), so the recount below only sees our rows
+            self._lock_course(course.id)
+            enrolled = set(enrollments.values_list("student_id", flat=True))
+            Enrollment.objects.bulk_create(
+                [
+                    Enrollment(student_id=pk, course=course)
+                    for pk in student_ids
+                    if pk not in enrolled
+                ],
+                ignore_conflicts=True,
+            )
+            # ignore_conflicts drops rows silently: count what was inserted
+            inserted = enrollments.count() - len(enrolled)
+        if inserted:
+            self.adjust_course_counts(course.id, enrollment_count=inserted)
+        AssignmentService.invalidate_gradebook(course.id)
+
+        return {"enrolled": inserted, "already_enrolled": len(enrolled)}, None
+
+    def list_enrollments(self) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, str]]]:
+        error = self.get_sparse_fields_error(EnrollmentSerializer, self.request)
+        if error:
+            return [], error
+
         qs = (
             Enrollment.objects.filter(course__teacher=self.auth_user)
             if self.auth_user.user_type == UserTypes.teacher
             else Enrollment.objects.filter(student=self.auth_user)
         )
-        data = self.paginate(qs, EnrollmentSerializer, self.request)
+        data = self.paginate(
+            qs,
+            EnrollmentValuesSerializer,
+            self.request,
+            cursor_ordering=("-enrolled_at", "-id"),
+            # a full COUNT(*) per page is too much for a table this size
+            count_strategy=CountStrategy.cached,
+        )
         return data, None
 
+    def export_enrollments(
+        self, pk: str
+    ) -> Tuple[Optional[QuerysetExport], Optional[str]]:
+        teacher, error = self._get_teacher()
+        if error:
+            return None, error
+
+        course, error = self._get_course(pk)
+        if error:
+            return None, error
+        if course.teacher_id != teacher.id:
+            return None, "Permission denied."
+
+        qs = Enrollment.objects.filter(course=course).order_by("enrolled_at", "id")
+        return (
+            QuerysetExport(qs, ENROLLMENT_EXPORT_COLUMNS, f"course-{course.id}-enrollments"),
+            None,
+        )
+
     # ------------------------------------
     # Lesson methods
     # ------------------------------------
     def list_lessons(
         self, course_pk: str
     ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-        course, error = self._get_course(course_pk)
+        error = self.get_sparse_fields_error(LessonSerializer, self.request)
         if error:
             return [], error
 
-        lessons_qs = course.lessons.all()
-        data = self.paginate(lessons_qs, LessonSerializer, self.request)
-        return data, None
+        cache_key = self.list_lessons_cache_key(course_pk)
+
+        def loader():
+            course, err = self._get_course(course_pk)
+            if err:
+                return None, err
+
+            lessons_qs = course.lessons.all()
+            return self.paginate(lessons_qs, LessonSerializer, self.request), None
+
+        data, error = CacheUtil.get_cache_value_or_default(
+            cache_key,
+            value_callback=loader,
+            require_fresh_data=False,
+            timeout=300,
+            single_flight=True,
+            early_recompute=True,
+        )
+        return data or [], error
 
     def add_lesson(
         self, validated_data: Dict[str, Any], **kwargs
@@ -197,15 +391,53 @@ class CourseService(ServicePaginationMixin):
         course, error = self._get_course(course_pk)
         if error:
             return None, error
-        if course.teacher != teacher:
+        if course.teacher_id != teacher.id:
             return None, "Permission denied."
 
         validated_data["course"] = course.id
         serializer = LessonSerializer(data=validated_data)
         serializer.is_valid(raise_exception=True)
         lesson = serializer.save()
+        self.adjust_course_counts(course.id, lesson_count=1)
+
+        CacheUtil.bump_namespace(self.lessons_list_namespace(course.id))
         return LessonSerializer(lesson).data, None
 
+    def add_lessons(
+        self, validated_data: Dict[str, Any], **kwargs
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        teacher, error = self._get_teacher()
+        if error:
+            return None, error
+
+        course, error = self._get_course(kwargs.get("pk"))
+        if error:
+            return None, error
+        if course.teacher_id != teacher.id:
+            return None, "Permission denied."
+
+        items = validated_data["lessons"]
+        taken = set(
+            course.lessons.filter(
+                order__in=[item["order"] for item in items]
+            ).values_list("order", flat=True)
+        )
+        if taken:
+            orders = ", ".join(str(order) for order in sorted(taken))
+            return None, {"order": f"Lesson order already used in this course: {orders}"}
+
+        try:
+            with transaction.atomic():
+                lessons = Lesson.objects.bulk_create(
+                    Lesson(course=course, **item) for item in items
+                )
+        except IntegrityError:
+            return None, {"order": "Lesson order must be unique within a course."}
+        self.adjust_course_counts(course.id, lesson_count=len(lessons))
+
+        CacheUtil.bump_namespace(self.lessons_list_namespace(course.id))
+        return LessonSerializer(lessons, many=True).data, None
+
     def delete_lesson(
         self, course_pk: str, lesson_pk: str
     ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
@@ -213,11 +445,18 @@ class CourseService(ServicePaginationMixin):
         if error:
             return None, error
 
-        lesson = Lesson.objects.filter(id=lesson_pk, course_id=course_pk).first()
+        lesson = (
+            Lesson.objects.select_related("course")
+            .filter(id=lesson_pk, course_id=course_pk)
+            .first()
+        )
         if not lesson:
             return None, "Lesson not found."
-        if lesson.course.teacher != teacher:
+        if lesson.course.teacher_id != teacher.id:
             return None, "Permission denied."
 
         lesson.delete()
+        self.adjust_course_counts(course_pk, lesson_count=-1)
+
+        CacheUtil.bump_namespace(self.lessons_list_namespace(course_pk))
         return {"message": "Lesson deleted successfully."}, None
@@ -1,7 +1,8 @@
-from django.contrib.auth.hashers import check_password, make_password
 from django.utils import timezone
 
 from accounts.models import User
+from accounts.services.users import UserService
+from services.password_hashing import make_password, verify_password
 from services.util import CustomAPIRequestUtil
 
 
@@ -15,6 +16,7 @@ class ClientService(CustomAPIRequestUtil):
 
         user.registration_complete = True
         user.save()
+        UserService(self.request).clear_temp_cache(user)
 
         return user, None
 
@@ -33,7 +35,7 @@ class PasswordService(CustomAPIRequestUtil):
         super().__init__(request)
 
     def verify_password(self, incoming_password, db_password):
-        return check_password(incoming_password, db_password)
+        return verify_password(incoming_password, db_password)
 
     def update_password(self, payload, user: User):
         new_password = payload.get("new_password")
@@ -49,5 +51,6 @@ class PasswordService(CustomAPIRequestUtil):
 
         user.password = make_password(new_password)
         user.save()
+        UserService(self.request).clear_temp_cache(user)
 
         return "Password set successfully", None
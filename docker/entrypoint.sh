@@ -6,7 +6,14 @@ until pg_isready -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USERNAME"; do
   sleep 1
 done
 
-echo "Postgres is up – running migrations"
-python manage.py migrate --noinput
+if [ "${RUN_MIGRATIONS:-true}" = "true" ]; then
+  echo "Postgres is up – running migrations"
+  python manage.py migrate --noinput
+fi
+
+if [ "${CACHE_WARM_ON_START:-false}" = "true" ]; then
+  echo "Warming cache in the background"
+  python manage.py warm_cache &
+fi
 
 exec "$@"
@@ -1,5 +1,12 @@
 # docker/gunicorn.conf.py
+import os
+
 bind = "0.0.0.0:8000"
 workers = 3
+# Threads let a worker keep serving other requests while its logins wait
+# on the password hashing pool (services.password_hashing).
+worker_class = "gthread"
+# also read by the settings, to keep the hashing pool smaller than this
+threads = int(os.getenv("GUNICORN_THREADS", 4))
 accesslog = "-"
 errorlog = "-"
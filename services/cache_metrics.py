@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+from services.cache_util import CacheUtil
+
+METRIC_PREFIX = "edutrack_cache"
+HISTOGRAM_SUFFIXES = ("bucket", "sum", "count")
+
+
+def render_cache_metrics(stats=None):
+    """
+    CacheUtil's per key-family stats in the Prometheus text exposition
+    format: one `<prefix>_<name>_total` counter per stat and a histogram
+    for `loader_seconds` and `value_bytes`, all labelled by `family`.
+    """
+    if stats is None:
+        stats = CacheUtil.get_family_stats()
+
+    counters = defaultdict(dict)
+    histograms = defaultdict(lambda: defaultdict(dict))
+    for family, values in sorted(stats.items()):
+        for name, value in values.items():
+            histogram_name, _, suffix = name.rpartition("_")
+            if histogram_name and suffix.partition(":")[0] in HISTOGRAM_SUFFIXES:
+                histograms[histogram_name][family][suffix] = value
+            else:
+                counters[name][family] = value
+
+    lines = []
+    for name in sorted(counters):
+        metric = f"{METRIC_PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for family, value in counters[name].items():
+            lines.append(f'{metric}{{family="{family}"}} {_format(value)}')
+
+    for name in sorted(histograms):
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for family, values in histograms[name].items():
+            lines += _render_histogram(metric, family, values)
+
+    return "\n".join(lines) + "\n"
+
+
+def _render_histogram(metric, family, values):
+    buckets = {
+        suffix.split(":", 1)[1]: count
+        for suffix, count in values.items()
+        if suffix.startswith("bucket:")
+    }
+    bounds = sorted((le for le in buckets if le != "+Inf"), key=float) + ["+Inf"]
+
+    lines, cumulative = [], 0
+    for le in bounds:
+        cumulative += buckets.get(le, 0)
+        lines.append(
+            f'{metric}_bucket{{family="{family}",le="{le}"}} {_format(cumulative)}'
+        )
+
+    lines.append(f'{metric}_sum{{family="{family}"}} {_format(values.get("sum", 0))}')
+    lines.append(
+        f'{metric}_count{{family="{family}"}} {_format(values.get("count", 0))}'
+    )
+    return lines
+
+
+def _format(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -1,31 +1,785 @@
+import json
+import math
+import os
+import pickle
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
 from django.utils.text import slugify
 
+from core.errors.app_errors import OperationError
+from services.log import AppLogger
+
+# First byte of a stored value that is a zlib-compressed, pickled CacheEntry.
+COMPRESSED_ENTRY_HEADER = b"\x01"
+
+LOADER_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+VALUE_BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class CacheEntry(
+    namedtuple(
+        "CacheEntry",
+        ["value", "expires_at", "delta", "error", "stale_at"],
+        defaults=(None, 0.0, None, None),
+    )
+):
+    """
+    What CacheUtil actually stores: the value plus when it expires and how
+    long its loader took (`delta`), which drives early recomputation.
+    `stale_at` is an optional soft expiry after which the value is still
+    served, but refreshed in the background.
+
+    Its presence is what makes a hit, so a cached empty list, zero or
+    not-found result (value None, optionally with `error`) is told apart
+    from a key that is simply absent.
+    """
+
+    __slots__ = ()
+
+    def should_recompute(self, beta=1.0):
+        # XFetch: the closer to expiry and the slower the loader, the more
+        # likely a reader volunteers to refresh the value ahead of time.
+        if not self.expires_at or not self.delta:
+            return False
+
+        jitter = -math.log(1.0 - random.random())
+        return time.time() + self.delta * beta * jitter >= self.expires_at
+
+    def is_stale(self):
+        return bool(self.stale_at) and time.time() >= self.stale_at
+
+
+class CacheStats:
+    """
+    Process-local cache counters, cheap enough to bump on every call.
+    Counters given a `family` (key prefix) are also kept per family and
+    queued until CacheUtil.publish_stats adds them to the totals shared by
+    every worker.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._family_counts = defaultdict(Counter)
+        self._unpublished = Counter()
+        self._published_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1, family=None):
+        with self._lock:
+            self._counts[name] += amount
+            if family is not None:
+                self._family_counts[family][name] += amount
+                self._unpublished[(family, name)] += amount
+
+    def observe(self, name, value, family, buckets):
+        """
+        Histogram sample: bumps `<name>_bucket:<le>` for the first bucket
+        that fits (buckets are not cumulative here), `<name>_sum` and
+        `<name>_count`.
+        """
+        le = next((str(bound) for bound in buckets if value <= bound), "+Inf")
+        with self._lock:
+            for key, amount in (
+                (f"{name}_bucket:{le}", 1),
+                (f"{name}_sum", value),
+                (f"{name}_count", 1),
+            ):
+                self._family_counts[family][key] += amount
+                self._unpublished[(family, key)] += amount
+
+    def take_unpublished(self, interval=0):
+        """
+        `{(family, name): amount}` gathered since the last call, or None if
+        that was less than `interval` seconds ago.
+        """
+        if time.monotonic() - self._published_at < interval:
+            return None
+
+        with self._lock:
+            self._published_at = time.monotonic()
+            unpublished, self._unpublished = self._unpublished, Counter()
+            return unpublished
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def family_snapshot(self):
+        with self._lock:
+            return {
+                family: dict(counts) for family, counts in self._family_counts.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._family_counts.clear()
+            self._unpublished.clear()
+
+
+class LocalCache:
+    """
+    Bounded per-process LRU cache with a per-entry expiry.
+
+    Values are kept pickled so every reader gets its own copy, exactly as it
+    would from Redis. `generation` moves on every eviction, which lets a
+    reader drop a value it fetched from Redis while an invalidation for the
+    same key was arriving.
+    """
+
+    def __init__(self, max_entries=1000, timeout=60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, payload = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout=None, generation=None):
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self._data[key] = (time.monotonic() + timeout, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+
+class LocalCacheInvalidator:
+    """
+    Broadcasts L1 evictions to every worker over Redis pub/sub.
+
+    Each process (gunicorn forks after import) lazily starts its own daemon
+    listener. The L1 is only trusted while that listener is subscribed, so a
+    worker that cannot hear invalidations falls straight through to Redis.
+    """
+
+    def __init__(self, local_cache: LocalCache):
+        self.local_cache = local_cache
+        self.origin = None
+        self.connected = False
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def channel(self):
+        return cache.make_key("cache-l1-invalidation")
+
+    @staticmethod
+    def get_redis_client():
+        # Only Redis can fan out; any other backend is per-process anyway.
+        if not isinstance(cache, RedisCache):
+            return None
+        return cache._cache.get_client(write=True)
+
+    def ensure_listening(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            self.origin = uuid.uuid4().hex
+            self.connected = False
+
+            if self.get_redis_client() is None:
+                self.connected = True
+                return
+
+            threading.Thread(
+                target=self._listen, name="cache-l1-invalidation", daemon=True
+            ).start()
+
+    def publish(self, *keys, flush=False):
+        client = self.get_redis_client()
+        if client is None:
+            return
+
+        message = {"origin": self.origin, "keys": list(keys), "flush": flush}
+        try:
+            client.publish(self.channel, json.dumps(message))
+        except Exception as e:
+            AppLogger.report(e)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.get_redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+
+                # Anything published while we were not subscribed is lost.
+                self.local_cache.clear()
+                self.connected = True
+
+                for message in pubsub.listen():
+                    self._handle(message.get("data"))
+            except Exception as e:
+                AppLogger.report(e)
+
+            self.connected = False
+            self.local_cache.clear()
+            time.sleep(1)
+
+    def _handle(self, data):
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+
+        if message.get("origin") == self.origin:
+            return
+
+        if message.get("flush"):
+            self.local_cache.clear()
+        else:
+            self.local_cache.delete(*message.get("keys", []))
+
+
+_local_cache = LocalCache(
+    max_entries=getattr(settings, "CACHE_L1_MAX_ENTRIES", 1000),
+    timeout=getattr(settings, "CACHE_L1_TIMEOUT", 60),
+)
+_local_cache_invalidator = LocalCacheInvalidator(_local_cache)
+cache_stats = CacheStats()
+
 
 class CacheUtil:
     @staticmethod
     def get_cache_value_or_default(
-        cache_key, value_callback=None, require_fresh_data=False, timeout=None
+        cache_key,
+        value_callback=None,
+        require_fresh_data=False,
+        timeout=None,
+        single_flight=False,
+        early_recompute=False,
+        negative_timeout=None,
+        soft_timeout=None,
+        background_refresh=None,
     ):
-        cached_data = None
-        error_details = None
+        """
+        `single_flight` lets only one caller run `value_callback` for an
+        expired key; the others briefly wait for its result (or keep the
+        value being refreshed). `early_recompute` refreshes popular keys
+        shortly before they expire instead of after.
+
+        With `soft_timeout` and `background_refresh`, a value older than
+        `soft_timeout` seconds is still returned straight away while a
+        Celery task reloads it; `timeout` stays the limit on how stale it
+        can get. `background_refresh` is a `(loader_path, loader_kwargs)`
+        pair naming an importable equivalent of `value_callback` (see
+        refresh_cache_value), since the callback itself cannot be queued.
+
+        Empty results are cached like any other value. Not-found (None) and
+        error results are kept for `negative_timeout` seconds, defaulting to
+        CACHE_NEGATIVE_TIMEOUT; pass 0 to not cache them at all.
+        """
+        CacheUtil.publish_stats()
+        family = CacheUtil.get_key_family(cache_key)
 
+        entry = None
         if not require_fresh_data:
-            cached_data = cache.get(cache_key)
+            entry = CacheUtil.get_cache_entry(cache_key)
+            cache_stats.incr("hits" if entry is not None else "misses", family=family)
+
+        if value_callback is None:
+            if entry is None:
+                return None, None
+            return entry.value, entry.error
+
+        stale_entry = None
+        if entry is not None:
+            if background_refresh and entry.is_stale():
+                cache_stats.incr("stale_hits", family=family)
+                CacheUtil._schedule_refresh(
+                    cache_key, background_refresh, timeout, soft_timeout
+                )
+                return entry.value, entry.error
+
+            if not early_recompute or not entry.should_recompute(
+                settings.CACHE_XFETCH_BETA
+            ):
+                return entry.value, entry.error
+
+            cache_stats.incr("early_recomputes", family=family)
+            stale_entry = entry
+
+        if single_flight:
+            return CacheUtil._load_single_flight(
+                cache_key,
+                value_callback,
+                timeout,
+                negative_timeout,
+                stale_entry,
+                soft_timeout,
+            )
+
+        return CacheUtil._load(
+            cache_key, value_callback, timeout, negative_timeout, soft_timeout
+        )
+
+    @staticmethod
+    def _load(
+        cache_key,
+        value_callback,
+        timeout=None,
+        negative_timeout=None,
+        soft_timeout=None,
+    ):
+        cached_data, error_details, delta = CacheUtil._call_loader(
+            cache_key, value_callback
+        )
+
+        if cached_data is not None and not error_details:
+            CacheUtil.set_cache_value(
+                cache_key, cached_data, timeout, delta=delta, soft_timeout=soft_timeout
+            )
+            return cached_data, error_details
+
+        if negative_timeout is None:
+            negative_timeout = settings.CACHE_NEGATIVE_TIMEOUT
 
-        if not cached_data:
-            if value_callback is not None:
-                cached_data, error_details = value_callback()
-                if cached_data:
-                    CacheUtil.set_cache_value(cache_key, cached_data, timeout=timeout)
+        cacheable_error = CacheUtil._as_cacheable_error(error_details)
+        if negative_timeout and cacheable_error is not False:
+            CacheUtil.set_cache_value(
+                cache_key,
+                cached_data,
+                negative_timeout,
+                delta=delta,
+                error=cacheable_error,
+            )
 
         return cached_data, error_details
 
     @staticmethod
-    def set_cache_value(cache_key, cached_data, timeout=None):
+    def _call_loader(cache_key, value_callback):
+        family = CacheUtil.get_key_family(cache_key)
+        cache_stats.incr("loader_calls", family=family)
+
+        started_at = time.monotonic()
+        cached_data, error_details = value_callback()
+        delta = time.monotonic() - started_at
+
+        cache_stats.observe("loader_seconds", delta, family, LOADER_SECONDS_BUCKETS)
+        return cached_data, error_details, delta
+
+    @staticmethod
+    def _as_cacheable_error(error_details):
+        """The picklable form of a loader error, or False if it is not cacheable."""
+        if error_details is None or isinstance(error_details, str):
+            return error_details
+
+        if isinstance(error_details, OperationError):
+            # The originating request is neither picklable nor worth keeping.
+            return OperationError(
+                message=error_details.get_message(),
+                status_code=error_details.status_code,
+            )
+
+        return False
+
+    @staticmethod
+    def _load_single_flight(
+        cache_key,
+        value_callback,
+        timeout,
+        negative_timeout=None,
+        stale_entry=None,
+        soft_timeout=None,
+    ):
+        lock_key = f"lock:{cache_key}"
+        token = uuid.uuid4().hex
+
+        if cache.add(lock_key, token, timeout=settings.CACHE_LOCK_TIMEOUT):
+            try:
+                return CacheUtil._load(
+                    cache_key, value_callback, timeout, negative_timeout, soft_timeout
+                )
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+
+        # Someone else is already loading this key.
+        family = CacheUtil.get_key_family(cache_key)
+        if stale_entry is not None:
+            cache_stats.incr("collapsed_loader_calls", family=family)
+            return stale_entry.value, stale_entry.error
+
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            entry = CacheUtil.get_cache_entry(cache_key)
+            if entry is not None:
+                cache_stats.incr("collapsed_loader_calls", family=family)
+                return entry.value, entry.error
+
+        cache_stats.incr("lock_wait_timeouts", family=family)
+        return CacheUtil._load(
+            cache_key, value_callback, timeout, negative_timeout, soft_timeout
+        )
+
+    @staticmethod
+    def _schedule_refresh(cache_key, background_refresh, timeout, soft_timeout):
+        # One queued refresh per key, however many readers see it stale.
+        refresh_key = f"refresh:{cache_key}"
+        if not cache.add(refresh_key, 1, timeout=settings.CACHE_REFRESH_LOCK_TIMEOUT):
+            return
+
+        from core.tasks import refresh_cache_value_queue
+
+        loader_path, loader_kwargs = background_refresh
+        try:
+            refresh_cache_value_queue.delay(
+                cache_key, loader_path, loader_kwargs, timeout, soft_timeout
+            )
+            cache_stats.incr(
+                "background_refreshes", family=CacheUtil.get_key_family(cache_key)
+            )
+        except Exception as e:
+            AppLogger.report(e)
+            cache.delete(refresh_key)
+
+    @staticmethod
+    def refresh_cache_value(
+        cache_key, loader_path, loader_kwargs=None, timeout=None, soft_timeout=None
+    ):
+        """
+        Reloads `cache_key` by calling the loader at `loader_path`
+        ("package.module:Class.method") with `loader_kwargs`. Runs in the
+        Celery worker.
+
+        An entry that was invalidated in the meantime is left alone, so the
+        refresh cannot bring back data a write has just replaced. The
+        rendered response built from the old value is dropped too.
+        """
+        try:
+            if CacheUtil.get_cache_entry(cache_key) is None:
+                return
+
+            loader = CacheUtil.resolve_loader(loader_path)
+            CacheUtil._load(
+                cache_key,
+                lambda: loader(**(loader_kwargs or {})),
+                timeout,
+                soft_timeout=soft_timeout,
+            )
+            CacheUtil.clear_cache(CacheUtil.generate_response_cache_key(cache_key))
+        finally:
+            cache.delete(f"refresh:{cache_key}")
+
+    @staticmethod
+    def resolve_loader(loader_path):
+        module_path, _, attr_path = loader_path.partition(":")
+        loader = import_module(module_path)
+        for attr in attr_path.split("."):
+            loader = getattr(loader, attr)
+
+        return loader
+
+    @staticmethod
+    def get_cache_entry(cache_key):
+        """The stored CacheEntry, or None when nothing is cached for the key."""
+        if not CacheUtil.uses_local_cache(cache_key):
+            return CacheUtil._as_entry(cache.get(cache_key))
+
+        entry = _local_cache.get(cache_key)
+        if entry is not None:
+            return entry
+
+        generation = _local_cache.generation
+        entry = CacheUtil._as_entry(cache.get(cache_key))
+        if entry is not None:
+            _local_cache.set(cache_key, entry, generation=generation)
+
+        return entry
+
+    @staticmethod
+    def _as_entry(cached_data):
+        if cached_data is None or isinstance(cached_data, CacheEntry):
+            return cached_data
+
+        if isinstance(cached_data, bytes) and cached_data.startswith(
+            COMPRESSED_ENTRY_HEADER
+        ):
+            payload = zlib.decompress(cached_data[len(COMPRESSED_ENTRY_HEADER) :])
+            return pickle.loads(payload)
+
+        # Written before values were wrapped; still readable until it expires.
+        return CacheEntry(cached_data)
+
+    @staticmethod
+    def get_cache_value(cache_key):
+        entry = CacheUtil.get_cache_entry(cache_key)
+        return entry.value if entry is not None else None
+
+    @staticmethod
+    def set_cache_value(
+        cache_key, cached_data, timeout=None, delta=0.0, error=None, soft_timeout=None
+    ):
+        if not timeout:
+            timeout = 60 * 60 * 24 * 7
+
+        now = time.time()
+        stale_at = now + soft_timeout if soft_timeout else None
+        entry = CacheEntry(cached_data, now + timeout, delta, error, stale_at)
+        cache.set(cache_key, CacheUtil._encode_entry(cache_key, entry), timeout=timeout)
+
+        if CacheUtil.uses_local_cache(cache_key):
+            _local_cache.delete(cache_key)
+            _local_cache_invalidator.publish(cache_key)
+            _local_cache.set(cache_key, entry, timeout=timeout)
+
+    @staticmethod
+    def _encode_entry(cache_key, entry):
+        """
+        What is written to Redis for `entry`: the entry itself, or once its
+        pickle reaches CACHE_COMPRESS_MIN_SIZE bytes, the zlib-compressed
+        pickle behind COMPRESSED_ENTRY_HEADER. _as_entry undoes either.
+        """
+        family = CacheUtil.get_key_family(cache_key)
+        payload = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+        cache_stats.observe("value_bytes", len(payload), family, VALUE_BYTES_BUCKETS)
+
+        min_size = settings.CACHE_COMPRESS_MIN_SIZE
+        if not min_size or len(payload) < min_size:
+            return entry
+
+        compressed = COMPRESSED_ENTRY_HEADER + zlib.compress(
+            payload, settings.CACHE_COMPRESS_LEVEL
+        )
+        if len(compressed) >= len(payload):
+            # Already dense (e.g. encrypted response bodies); not worth it.
+            return entry
+
+        cache_stats.incr("compressed_writes", family=family)
+        cache_stats.incr("compression_bytes_in", len(payload), family=family)
+        cache_stats.incr("compression_bytes_out", len(compressed), family=family)
+        return compressed
+
+    @staticmethod
+    def get_many(*cache_keys):
+        """
+        CacheEntries for whichever keys are cached, fetched with a single
+        MGET (after the L1, for keys that use it).
+        """
+        entries = {}
+        remote_keys = []
+        for cache_key in cache_keys:
+            entry = None
+            if CacheUtil.uses_local_cache(cache_key):
+                entry = _local_cache.get(cache_key)
+
+            if entry is not None:
+                entries[cache_key] = entry
+            else:
+                remote_keys.append(cache_key)
+
+        if not remote_keys:
+            return entries
+
+        generation = _local_cache.generation
+        for cache_key, cached_data in cache.get_many(remote_keys).items():
+            entry = CacheUtil._as_entry(cached_data)
+            if entry is None:
+                continue
+
+            entries[cache_key] = entry
+            if CacheUtil.uses_local_cache(cache_key):
+                _local_cache.set(cache_key, entry, generation=generation)
+
+        return entries
+
+    @staticmethod
+    def set_many(data, timeout=None, error=None):
+        """Writes `{cache_key: value}` in one pipelined round-trip."""
+        if not data:
+            return
+
         if not timeout:
             timeout = 60 * 60 * 24 * 7
-        cache.set(cache_key, cached_data, timeout=timeout)
+
+        expires_at = time.time() + timeout
+        entries = {
+            cache_key: CacheEntry(value, expires_at, 0.0, error)
+            for cache_key, value in data.items()
+        }
+        cache.set_many(
+            {
+                cache_key: CacheUtil._encode_entry(cache_key, entry)
+                for cache_key, entry in entries.items()
+            },
+            timeout=timeout,
+        )
+
+        local_keys = [key for key in entries if CacheUtil.uses_local_cache(key)]
+        if local_keys:
+            _local_cache.delete(*local_keys)
+            _local_cache_invalidator.publish(*local_keys)
+            for cache_key in local_keys:
+                _local_cache.set(cache_key, entries[cache_key], timeout=timeout)
+
+    @staticmethod
+    def get_many_or_default(value_callbacks, timeout=None, negative_timeout=None):
+        """
+        Multi-key get_cache_value_or_default: `value_callbacks` maps each
+        cache key to its loader and only the loaders of missing keys run.
+        Returns `{cache_key: (value, error)}`, costing one read and two
+        pipelined writes however many keys are involved (loader errors are
+        still written one by one).
+        """
+        CacheUtil.publish_stats()
+
+        entries = CacheUtil.get_many(*value_callbacks.keys())
+        results = {
+            cache_key: (entry.value, entry.error)
+            for cache_key, entry in entries.items()
+        }
+
+        if negative_timeout is None:
+            negative_timeout = settings.CACHE_NEGATIVE_TIMEOUT
+
+        found, not_found = {}, {}
+        for cache_key, value_callback in value_callbacks.items():
+            family = CacheUtil.get_key_family(cache_key)
+            if cache_key in results:
+                cache_stats.incr("hits", family=family)
+                continue
+
+            cache_stats.incr("misses", family=family)
+            cached_data, error_details, _ = CacheUtil._call_loader(
+                cache_key, value_callback
+            )
+            results[cache_key] = (cached_data, error_details)
+
+            if cached_data is not None and not error_details:
+                found[cache_key] = cached_data
+                continue
+
+            cacheable_error = CacheUtil._as_cacheable_error(error_details)
+            if not negative_timeout or cacheable_error is False:
+                continue
+
+            if cacheable_error is None:
+                not_found[cache_key] = cached_data
+            else:
+                CacheUtil.set_cache_value(
+                    cache_key, cached_data, negative_timeout, error=cacheable_error
+                )
+
+        CacheUtil.set_many(found, timeout=timeout)
+        CacheUtil.set_many(not_found, timeout=negative_timeout)
+
+        return results
+
+    @staticmethod
+    def get_stats():
+        return cache_stats.snapshot()
+
+    @staticmethod
+    def publish_stats(force=False):
+        """
+        Adds this worker's counters gathered since the last publish to the
+        totals in Redis, at most every CACHE_METRICS_PUBLISH_INTERVAL
+        seconds unless `force`d. One pipelined round-trip.
+        """
+        interval = 0 if force else settings.CACHE_METRICS_PUBLISH_INTERVAL
+        unpublished = cache_stats.take_unpublished(interval)
+        if not unpublished:
+            return
+
+        client = LocalCacheInvalidator.get_redis_client()
+        if client is None:
+            # Nothing shared to publish to; this process' counters are all.
+            return
+
+        stats_key = cache.make_key("cache-stats")
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for (family, name), amount in unpublished.items():
+                pipeline.hincrbyfloat(stats_key, f"{family}:{name}", amount)
+            pipeline.execute()
+        except Exception as e:
+            AppLogger.report(e)
+
+    @staticmethod
+    def get_family_stats():
+        """
+        `{family: {name: value}}` totals across all workers (just this
+        process without Redis), e.g. for the metrics endpoint.
+        """
+        CacheUtil.publish_stats(force=True)
+
+        client = LocalCacheInvalidator.get_redis_client()
+        if client is None:
+            return cache_stats.family_snapshot()
+
+        stats = defaultdict(dict)
+        for field, value in client.hgetall(cache.make_key("cache-stats")).items():
+            family, _, name = field.decode().partition(":")
+            stats[family][name] = float(value)
+
+        return dict(stats)
+
+    @staticmethod
+    def get_compression_stats():
+        """Compression ratio and bytes saved so far, per key family."""
+        stats = {}
+        for family, counts in cache_stats.family_snapshot().items():
+            bytes_in = counts.get("compression_bytes_in", 0)
+            if not bytes_in:
+                continue
+
+            bytes_out = counts.get("compression_bytes_out", 0)
+            stats[family] = {
+                "compressed_writes": counts.get("compressed_writes", 0),
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "bytes_saved": bytes_in - bytes_out,
+                "ratio": round(bytes_out / bytes_in, 3),
+            }
+
+        return stats
 
     @staticmethod
     def clear_cache(*cache_keys):
@@ -33,6 +787,75 @@ class CacheUtil:
         # for key in list(cache_keys):
         #     cache.set(key, None, timeout=0)
 
+        if settings.CACHE_L1_ENABLED:
+            _local_cache.delete(*cache_keys)
+            _local_cache_invalidator.publish(*cache_keys)
+
+    @staticmethod
+    def clear_local_cache():
+        """Drops every L1 entry in every worker, e.g. after a Redis flush."""
+        _local_cache.clear()
+        _local_cache_invalidator.publish(flush=True)
+
+    @staticmethod
+    def uses_local_cache(cache_key):
+        if not settings.CACHE_L1_ENABLED:
+            return False
+
+        if CacheUtil.get_key_family(cache_key) not in settings.CACHE_L1_KEY_FAMILIES:
+            return False
+
+        _local_cache_invalidator.ensure_listening()
+        return _local_cache_invalidator.connected
+
+    @staticmethod
+    def get_namespace_version(namespace):
+        version_key = f"ns:{namespace}"
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, CacheUtil._new_namespace_version(), timeout=None)
+            version = cache.get(version_key)
+
+        return version
+
+    @staticmethod
+    def bump_namespace(*namespaces):
+        """Invalidates every key generated under each namespace in O(1)."""
+        for namespace in namespaces:
+            version_key = f"ns:{namespace}"
+            try:
+                cache.incr(version_key)
+            except ValueError:
+                cache.set(version_key, CacheUtil._new_namespace_version(), timeout=None)
+
+    @staticmethod
+    def _new_namespace_version():
+        # Time based, so losing a version key to eviction can never bring
+        # back keys written under an older version.
+        return int(time.time() * 1000)
+
+    @staticmethod
+    def generate_namespaced_cache_key(namespace, **params):
+        """
+        A key under the namespace's current version that also encodes the
+        (normalized) query parameters, e.g. one key per page of a list.
+        """
+        cache_key = f"{namespace}:v{CacheUtil.get_namespace_version(namespace)}"
+
+        query = urlencode(
+            sorted((name, value) for name, value in params.items() if value is not None)
+        )
+        return f"{cache_key}:{query}" if query else cache_key
+
+    @staticmethod
+    def generate_response_cache_key(cache_key):
+        """Where the rendered response built from `cache_key`'s data is kept."""
+        return f"response:{cache_key}"
+
+    @staticmethod
+    def get_key_family(cache_key):
+        return str(cache_key).split(":", 1)[0]
+
     @staticmethod
     def generate_cache_key(*args):
         if not args:
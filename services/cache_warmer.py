@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Max
+from django.urls import reverse
+
+from accounts.models import User
+from accounts.services.users import UserService
+from assignments.services.assignment_service import AssignmentService
+from courses.models import Course
+from courses.services.course_service import CourseService
+from services.log import AppLogger
+from services.util import make_background_request
+
+
+class CacheWarmer:
+    """
+    Pre-populates the hottest cache keys, e.g. after a deploy or a Redis
+    flush: the first page of the published course list, then the detail,
+    first lesson page and first assignment page of the most recently
+    active courses, and the permission and role names of the most
+    recently logged-in users.
+
+    Every key is loaded through the same service call a request would
+    make, so it lands under exactly the key requests read. Keys that are
+    already cached are left as they are. Loads run in batches on a pool
+    of `concurrency` threads.
+    """
+
+    def __init__(self, courses=None, users=None, concurrency=None, batch_size=None):
+        self.courses = settings.CACHE_WARM_COURSES if courses is None else courses
+        self.users = settings.CACHE_WARM_USERS if users is None else users
+        self.concurrency = concurrency or settings.CACHE_WARM_CONCURRENCY
+        self.batch_size = batch_size or self.concurrency * 4
+
+    def warm(self):
+        """Runs every job; returns `{"warmed": n, "failed": n}`."""
+        jobs = self.get_jobs()
+        results = {"warmed": 0, "failed": 0}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for start in range(0, len(jobs), self.batch_size):
+                batch = jobs[start : start + self.batch_size]
+                for warmed in executor.map(self._run_job, batch):
+                    results["warmed" if warmed else "failed"] += 1
+
+        return results
+
+    def get_jobs(self):
+        """`(name, loader)` pairs; each loader returns `(data, error)`."""
+        jobs = [("published_courses_list", self.warm_published_courses)]
+
+        for course_id in self.get_recently_active_course_ids():
+            jobs += [
+                (f"course_detail:{course_id}", self.course_detail_job(course_id)),
+                (f"lessons_list:{course_id}", self.lessons_job(course_id)),
+                (f"assignments_list:{course_id}", self.assignments_job(course_id)),
+            ]
+
+        for user in self.get_recently_logged_in_users():
+            jobs.append((f"user:{user.id}", self.user_job(user)))
+
+        return jobs
+
+    def get_recently_active_course_ids(self):
+        if not self.courses:
+            return []
+
+        return list(
+            Course.objects.filter(is_published=True)
+            .annotate(last_enrolled_at=Max("enrollments__enrolled_at"))
+            .order_by(F("last_enrolled_at").desc(nulls_last=True), "-updated_at")
+            .values_list("id", flat=True)[: self.courses]
+        )
+
+    def get_recently_logged_in_users(self):
+        if not self.users:
+            return []
+
+        return list(
+            User.objects.filter(is_active=True, last_login__isnull=False).order_by(
+                "-last_login"
+            )[: self.users]
+        )
+
+    @staticmethod
+    def make_request(url_name, **kwargs):
+        # The same URL a client would hit, so page cache keys match what
+        # requests produce; pagination links leave the host out.
+        url = urljoin(settings.CACHE_WARM_BASE_URL, reverse(url_name, kwargs=kwargs))
+        return make_background_request(url)
+
+    def warm_published_courses(self):
+        return CourseService(self.make_request("list-courses")).list_courses()
+
+    def course_detail_job(self, course_id):
+        def job():
+            request = self.make_request("get-course", pk=course_id)
+            return CourseService(request).get_course_detail(course_id)
+
+        return job
+
+    def lessons_job(self, course_id):
+        def job():
+            request = self.make_request("list-lessons", pk=course_id)
+            return CourseService(request).list_lessons(course_id)
+
+        return job
+
+    def assignments_job(self, course_id):
+        def job():
+            request = self.make_request("list-assignments", course_id=course_id)
+            return AssignmentService(request).list_assignments(course_id)
+
+        return job
+
+    @staticmethod
+    def user_job(user):
+        def job():
+            return UserService(None).get_user_permission_and_role_names(user), None
+
+        return job
+
+    @staticmethod
+    def _run_job(job):
+        name, loader = job
+        try:
+            _, error = loader()
+            if error:
+                AppLogger.print(f"Cache warm-up of {name} failed: {error}")
+            return not error
+        except Exception as e:
+            AppLogger.report(e)
+            return False
+        finally:
+            # Each pool thread opened its own connection.
+            connections.close_all()
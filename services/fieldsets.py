@@ -0,0 +1,99 @@
+from typing import Iterable, List, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from rest_framework.request import Request
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        type=str,
+        description="Comma-separated fields to return, e.g. `id,title`",
+    ),
+    OpenApiParameter(
+        name="exclude",
+        type=str,
+        description="Comma-separated fields to leave out",
+    ),
+]
+
+
+class SparseFieldsetMixin:
+    """
+    ModelSerializer mixin for sparse fieldsets: `?fields=id,title` keeps
+    only those fields, `?exclude=description` drops some. Pass the selected
+    names as `fields=`. `get_only_columns` gives the model columns the
+    selection reads, for `queryset.only()`, so unneeded text columns are
+    never fetched.
+    """
+
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_selectable_fields(cls) -> List[str]:
+        return list(cls.Meta.fields)
+
+    @classmethod
+    def get_unknown_fields(cls, request: Request) -> List[str]:
+        requested = cls.get_query_list(request, cls.fields_query_param) or []
+        excluded = cls.get_query_list(request, cls.exclude_query_param) or []
+        field_names = cls.get_selectable_fields()
+        return [name for name in requested + excluded if name not in field_names]
+
+    @classmethod
+    def get_requested_fields(cls, request: Request) -> Optional[List[str]]:
+        """The selected field names, or None when the request selects none."""
+        requested = cls.get_query_list(request, cls.fields_query_param)
+        excluded = cls.get_query_list(request, cls.exclude_query_param) or []
+        if requested is None and not excluded:
+            return None
+
+        unknown = cls.get_unknown_fields(request)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": f"Unknown field(s): {', '.join(unknown)}"}
+            )
+
+        return [
+            name
+            for name in cls.get_selectable_fields()
+            if (requested is None or name in requested) and name not in excluded
+        ]
+
+    @classmethod
+    def get_only_columns(
+        cls, fields: Iterable[str], extra: Iterable[str] = ()
+    ) -> List[str]:
+        """
+        Model attributes behind `fields` (plus `extra`, e.g. ordering
+        fields read from each row), always including the primary key.
+        """
+        model = cls.Meta.model
+        declared = cls().fields
+        columns = [model._meta.pk.name]
+        for name in list(fields) + [field.lstrip("-") for field in extra]:
+            source = declared[name].source if name in declared else name
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                # methods and properties have no column of their own
+                continue
+            if model_field.concrete and source not in columns:
+                columns.append(source)
+
+        return columns
+
+    @staticmethod
+    def get_query_list(request: Request, param: str) -> Optional[List[str]]:
+        """The comma-separated names in `param`, or None when there are none."""
+        value = request.query_params.get(param) or ""
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        return names or None
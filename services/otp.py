@@ -0,0 +1,69 @@
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from django.conf import settings
+from django.db.models import F, TextChoices
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+OTP_DIGITS = 6
+
+
+class OtpStatus(TextChoices):
+    valid = "valid"
+    invalid = "invalid"
+    expired = "expired"
+    locked = "locked"
+
+
+def hash_otp(otp: str, purpose: str, subject: str) -> str:
+    """
+    HMAC-SHA256 of the OTP, keyed with OTP_HMAC_KEY and bound to what it
+    was issued for (`purpose`, e.g. "register") and to whom (`subject`),
+    so a stored digest is useless for any other record.
+    """
+    return salted_hmac(
+        f"services.otp.{purpose}",
+        f"{subject}:{otp}",
+        secret=settings.OTP_HMAC_KEY,
+        algorithm="sha256",
+    ).hexdigest()
+
+
+def issue_otp(purpose: str, subject: str) -> Tuple[str, str, datetime]:
+    """A new OTP, its digest to store and when it expires."""
+    if settings.DEBUG:
+        otp = "123456"
+    else:
+        otp = str(secrets.randbelow(10**OTP_DIGITS)).zfill(OTP_DIGITS)
+
+    expires_at = timezone.now() + timedelta(minutes=settings.OTP_TTL_MINUTES)
+    return otp, hash_otp(otp, purpose, subject), expires_at
+
+
+def verify_otp(record, otp: str, purpose: str, subject: str) -> OtpStatus:
+    """
+    Checks `otp` against a record with `otp`, `otp_expires_at` and
+    `otp_attempts` fields. Every check of an unexpired OTP uses up an
+    attempt, counted atomically in the database, so concurrent guesses
+    cannot exceed OTP_MAX_ATTEMPTS; the digests are compared in constant
+    time.
+    """
+    if not record.otp or not record.otp_expires_at:
+        return OtpStatus.invalid
+    if record.otp_expires_at <= timezone.now():
+        return OtpStatus.expired
+
+    counted = (
+        type(record)
+        ._base_manager.filter(pk=record.pk, otp_attempts__lt=settings.OTP_MAX_ATTEMPTS)
+        .update(otp_attempts=F("otp_attempts") + 1)
+    )
+    if not counted:
+        return OtpStatus.locked
+
+    if not hmac.compare_digest(record.otp, hash_otp(str(otp), purpose, subject)):
+        return OtpStatus.invalid
+    return OtpStatus.valid
@@ -1,22 +1,369 @@
 # common/pagination.py
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q, TextChoices
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.request import Request
-from typing import Type, List, Any, Dict
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from typing import Type, List, Any, Dict, Optional, Sequence
+from urllib.parse import urlsplit, urlunsplit
+
+from services.cache_util import CacheUtil
+from services.fieldsets import SparseFieldsetMixin
+from services.values_serializer import ValuesSerializer
+
+
+class CountStrategy(TextChoices):
+    exact = "exact"
+    # exact, but cached per query for PAGINATION_COUNT_CACHE_TIMEOUT seconds
+    cached = "cached"
+    # planner statistics for big unfiltered tables, `cached` otherwise
+    estimated = "estimated"
+    skip = "skip"
+
+
+def get_cached_count(queryset) -> int:
+    sql, params = queryset.query.sql_with_params()
+    signature = hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    cache_key = f"count:{queryset.model._meta.db_table}:{signature}"
+
+    total, _ = CacheUtil.get_cache_value_or_default(
+        cache_key,
+        lambda: (queryset.count(), None),
+        timeout=settings.PAGINATION_COUNT_CACHE_TIMEOUT,
+    )
+    return total
+
+
+def get_estimated_count(queryset) -> Optional[int]:
+    """
+    The planner's row estimate (pg_class.reltuples) for an unfiltered
+    queryset on a table of at least PAGINATION_COUNT_ESTIMATE_MIN rows, or
+    None when an estimate would not do.
+    """
+    connection = connections[queryset.db]
+    if queryset.query.where or connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+
+    # -1 until the table has been analyzed
+    if not row or row[0] < settings.PAGINATION_COUNT_ESTIMATE_MIN:
+        return None
+    return row[0]
+
+
+class CountingPaginator(DjangoPaginator):
+    """
+    Paginator whose reported `total` follows a CountStrategy.
+
+    With `estimated` or `skip`, pages are found by fetching one row more
+    than a page instead of counting, and `total` is the estimate or None.
+    """
+
+    def __init__(self, object_list, per_page, count_strategy=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_strategy = count_strategy or CountStrategy.exact
+        self.total = None
+
+    @cached_property
+    def count(self):
+        if self.count_strategy == CountStrategy.exact:
+            return super().count
+        return get_cached_count(self.object_list)
+
+    def page(self, number):
+        if self.count_strategy in (CountStrategy.exact, CountStrategy.cached):
+            page = super().page(number)
+            self.total = self.count
+            return page
+
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+
+        # A lower bound, which is all Page.has_next() needs.
+        self.count = bottom + len(rows)
+
+        if self.count_strategy == CountStrategy.estimated:
+            self.total = get_estimated_count(self.object_list)
+            if self.total is None:
+                self.total = get_cached_count(self.object_list)
+
+        return self._get_page(rows[: self.per_page], number, self)
+
+
+def relative_url(url: Optional[str]) -> Optional[str]:
+    """
+    `url` without its scheme and host. Paginated payloads are cached and
+    served to every client (and built by the cache warmer against its own
+    base URL), so their links must not carry the host of whoever built them.
+    """
+    if url is None:
+        return None
+    parts = urlsplit(url)
+    return urlunsplit(("", "", parts.path, parts.query, parts.fragment))
+
+
+class CountedPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination counting with `count_strategy`. Clients can leave
+    the total out with `?include_total=false`, in which case it is None.
+    `next`/`previous` are root-relative links.
+    """
+
+    count_strategy = CountStrategy.exact
+    include_total_query_param = "include_total"
+
+    def get_count_strategy(self, request: Request) -> str:
+        include_total = request.query_params.get(self.include_total_query_param)
+        if str(include_total).lower() == "false":
+            return CountStrategy.skip
+        return self.count_strategy
+
+    # Called by PageNumberPagination.paginate_queryset after self.request is set.
+    def django_paginator_class(self, object_list, per_page):
+        return CountingPaginator(
+            object_list, per_page, self.get_count_strategy(self.request)
+        )
+
+    def get_paginated_total(self) -> Optional[int]:
+        return self.page.paginator.total
+
+    def get_next_link(self) -> Optional[str]:
+        return relative_url(super().get_next_link())
+
+    def get_previous_link(self) -> Optional[str]:
+        return relative_url(super().get_previous_link())
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.get_paginated_total(),
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique ordering such as ("-created_at", "-id").
+
+    Pages are selected with a WHERE on the last row seen instead of an
+    OFFSET, and no COUNT(*) is run, so any page costs about the same as the
+    first, given an index matching `ordering`. Cursors are opaque; the
+    response carries root-relative `next`/`previous` links and `results`.
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering: Sequence[str] = ("-created_at", "-id")):
+        self.ordering = tuple(ordering)
+        self.page_size = api_settings.PAGE_SIZE
+
+    @classmethod
+    def is_requested(cls, request: Request) -> bool:
+        params = request.query_params
+        return cls.cursor_query_param in params or (
+            params.get(cls.mode_query_param) == "cursor"
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self.parse_position(queryset.model, position)
+            queryset = queryset.filter(self._after(position, ordering))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        # rows are model instances, or dicts for a ValuesSerializer
+        read = row.get if isinstance(row, dict) else partial(getattr, row)
+        position = [read(field.lstrip("-")) for field in self.ordering]
+        # str() keeps datetimes to the microsecond, which equality needs.
+        payload = json.dumps({"p": position, "r": reverse}, default=str)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+
+        url = remove_query_param(self.request.get_full_path(), "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request: Request):
+        """`(position, reverse)` from the request's cursor, `(None, False)` if none."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position, reverse = payload["p"], bool(payload["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def parse_position(self, model, position) -> list:
+        """The cursor's values as the ordering fields' Python types."""
+        try:
+            values = [
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _flip(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _after(position, ordering) -> Q:
+        # (a, b) after (x, y) in `ordering` <=> a > x OR (a = x AND b > y),
+        # with > read as < for descending fields.
+        condition = Q()
+        for index, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            clause = Q(**{f"{field.lstrip('-')}__{lookup}": position[index]})
+            for previous, value in zip(ordering[:index], position):
+                clause &= Q(**{previous.lstrip("-"): value})
+            condition |= clause
+
+        return condition
+
+def is_values_serializer(serializer_class) -> bool:
+    return isinstance(serializer_class, type) and issubclass(
+        serializer_class, ValuesSerializer
+    )
+
 
 class ServicePaginationMixin:
     """
     Mixin to give any service a self.paginate(...) helper.
     """
     page_size: int = None       # optional override
-    pagination_class = PageNumberPagination
+    count_strategy: str = None  # optional override
+    pagination_class = CountedPageNumberPagination
 
     def paginate(
         self,
         queryset,
         serializer_class: Type,
         request: Request,
+        cursor_ordering: Optional[Sequence[str]] = None,
+        count_strategy: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
-        paginator = self.pagination_class()
+        """
+        Endpoints passing `cursor_ordering` (a unique ordering, e.g.
+        ("-submitted_at", "-id")) also serve keyset pages when the client
+        asks for them with `?pagination=cursor` or follows a cursor link.
+        `count_strategy` overrides the service's for one endpoint.
+
+        With a SparseFieldsetMixin serializer, `?fields=`/`?exclude=` also
+        restrict the columns selected from the queryset. A ValuesSerializer
+        is fed `queryset.values()` rows instead of model instances.
+        """
+        fields = self.get_sparse_fields(serializer_class, request)
+        if is_values_serializer(serializer_class):
+            queryset = serializer_class.get_values_queryset(
+                queryset, fields, extra=cursor_ordering or ()
+            )
+        elif fields is not None:
+            queryset = queryset.only(
+                *serializer_class.get_only_columns(fields, extra=cursor_ordering or ())
+            )
+        if fields is not None:
+            serializer_class = partial(serializer_class, fields=fields)
+
+        if cursor_ordering and KeysetPagination.is_requested(request):
+            paginator = KeysetPagination(cursor_ordering)
+        else:
+            paginator = self.pagination_class()
+            count_strategy = count_strategy or self.count_strategy
+            if count_strategy is not None:
+                paginator.count_strategy = count_strategy
+
         if self.page_size is not None:
             paginator.page_size = self.page_size
 
@@ -27,3 +374,47 @@ class ServicePaginationMixin:
             return paginator.get_paginated_response(serialized).data
 
         return serializer_class(queryset, many=True).data
+
+    @staticmethod
+    def get_sparse_fields(serializer_class: Type, request: Request) -> Optional[List[str]]:
+        if is_values_serializer(serializer_class) or (
+            isinstance(serializer_class, type)
+            and issubclass(serializer_class, SparseFieldsetMixin)
+        ):
+            return serializer_class.get_requested_fields(request)
+        return None
+
+    def get_sparse_fields_error(
+        self, serializer_class: Type, request: Request
+    ) -> Optional[Dict[str, str]]:
+        """Error for unknown `?fields=`/`?exclude=` names, to return as-is."""
+        unknown = serializer_class.get_unknown_fields(request)
+        if unknown:
+            return {"fields": f"Unknown field(s): {', '.join(unknown)}"}
+        return None
+
+    def get_pagination_params(self, request: Request) -> Dict[str, Any]:
+        """
+        The query params that select a page, normalized so equivalent
+        requests map to the same cache key.
+        """
+        paginator = self.pagination_class()
+        if self.page_size is not None:
+            paginator.page_size = self.page_size
+
+        page = str(request.query_params.get(paginator.page_query_param) or 1).strip()
+        skip_total = paginator.get_count_strategy(request) == CountStrategy.skip
+        fields, exclude = (
+            SparseFieldsetMixin.get_query_list(request, param)
+            for param in (
+                SparseFieldsetMixin.fields_query_param,
+                SparseFieldsetMixin.exclude_query_param,
+            )
+        )
+        return {
+            "page": int(page) if page.isdigit() else page,
+            "page_size": paginator.get_page_size(request),
+            "include_total": "false" if skip_total else None,
+            "fields": ",".join(sorted(fields)) if fields else None,
+            "exclude": ",".join(sorted(exclude)) if exclude else None,
+        }
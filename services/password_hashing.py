@@ -0,0 +1,97 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Callable
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from core.exceptions.custom_exception_handler import ServiceBusyException
+
+
+class PasswordHashingPool:
+    """
+    Runs password hashing on a small per-process thread pool so a burst of
+    logins or signups cannot occupy every request thread: at most
+    PASSWORD_HASHING_WORKERS hashes run at once and PASSWORD_HASHING_QUEUE
+    more may wait, never more than GUNICORN_THREADS - 1 in all, since each
+    caller blocks a request thread. Beyond that, ServiceBusyException (503
+    + Retry-After) is raised straight away, and also when a hash waits
+    longer than PASSWORD_HASHING_TIMEOUT. hashlib and the argon2/bcrypt bindings release
+    the GIL while hashing, so threads run the hashes in parallel.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = None
+
+    def _ensure_executor(self):
+        # gunicorn forks workers; each one needs its own threads
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            slots = self.get_slot_count()
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(settings.PASSWORD_HASHING_WORKERS, slots),
+                thread_name_prefix="password-hashing",
+            )
+            self._slots = threading.BoundedSemaphore(slots)
+            self._pid = os.getpid()
+
+    @staticmethod
+    def get_slot_count() -> int:
+        wanted = settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_QUEUE
+        return max(1, min(wanted, settings.GUNICORN_THREADS - 1))
+
+    def submit(self, function: Callable, *args):
+        self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusyException(wait=settings.PASSWORD_HASHING_RETRY_AFTER)
+
+        # the slot is held until the hash finishes, even if its caller
+        # has given up waiting
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, function: Callable, *args):
+        future = self.submit(function, *args)
+        try:
+            return future.result(timeout=settings.PASSWORD_HASHING_TIMEOUT)
+        except TimeoutError:
+            raise ServiceBusyException(wait=settings.PASSWORD_HASHING_RETRY_AFTER)
+
+
+password_hashing_pool = PasswordHashingPool()
+
+
+def make_password(password: str) -> str:
+    return password_hashing_pool.run(hashers.make_password, password)
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """`hashers.check_password` on the pool, for a hash without its user."""
+    return password_hashing_pool.run(hashers.check_password, password, encoded)
+
+
+def check_password(user, password: str) -> bool:
+    """
+    `user.check_password` with the hashing run on the pool. A hash the
+    preferred hasher wants upgraded is rehashed and saved in this thread,
+    which holds the database connection.
+    """
+    needs_upgrade = []
+    verified = password_hashing_pool.run(
+        hashers.check_password,
+        password,
+        user.password,
+        lambda _: needs_upgrade.append(True),
+    )
+    if verified and needs_upgrade:
+        user.password = make_password(password)
+        user.save(update_fields=["password"])
+    return verified
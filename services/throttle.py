@@ -0,0 +1,185 @@
+import math
+import time
+from functools import wraps
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+
+from core.exceptions.custom_exception_handler import RateLimitException
+
+RATE_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """`"5/m"` or `"10/20m"` as `(limit, window seconds)`."""
+    limit, period = rate.split("/")
+    multiplier = int(period[:-1] or 1)
+    return int(limit), multiplier * RATE_PERIODS[period[-1]]
+
+
+def get_client_ip(request) -> str:
+    """
+    The client's IP: behind `TRUSTED_PROXY_COUNT` proxies, the
+    X-Forwarded-For entry the outermost one appended. Entries left of it
+    come from the client and are never trusted.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    if proxies > 0 and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get("REMOTE_ADDR") or ""
+
+
+class SlidingWindowThrottle:
+    """
+    Sliding-window counter per identity (an IP, a username, ...): the hits
+    in the current fixed window plus the previous window's, weighted by
+    how much of it the sliding window still covers.
+
+    On Redis, `hit` is a single pipelined round trip (INCR and EXPIRE of
+    the current window, GET of the previous one) and `counts` a single
+    MGET, whatever the number of identities. INCR is atomic, so
+    concurrent attempts are all counted. Other cache backends fall back
+    to `cache.add` + `cache.incr`.
+    """
+
+    def __init__(self, scope: str, limit: int, window: int):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    @classmethod
+    def from_rate(cls, scope: str, rate: str) -> "SlidingWindowThrottle":
+        return cls(scope, *parse_rate(rate))
+
+    def hit(self, *identities: str) -> List[int]:
+        """Counts an attempt for each identity; returns the new counts."""
+        window_keys = self._window_keys(identities)
+        client = self.get_redis_client()
+        if client is None:
+            return self._hit_fallback(window_keys)
+
+        pipe = client.pipeline()
+        for current, previous, _ in window_keys:
+            pipe.incr(current)
+            pipe.expire(current, self.window * 2)
+            pipe.get(previous)
+        results = pipe.execute()
+
+        return [
+            self._estimate(results[i * 3], results[i * 3 + 2], weight)
+            for i, (_, _, weight) in enumerate(window_keys)
+        ]
+
+    def refund(self, *identities: str) -> None:
+        """Takes back one `hit` for each identity, e.g. once it succeeded."""
+        window_keys = self._window_keys(identities)
+        client = self.get_redis_client()
+        if client is None:
+            for current, _, _ in window_keys:
+                try:
+                    cache.decr(current)
+                except ValueError:  # the window has rolled over since the hit
+                    pass
+            return
+
+        pipe = client.pipeline()
+        for current, _, _ in window_keys:
+            pipe.decr(current)
+            pipe.expire(current, self.window * 2)
+        pipe.execute()
+
+    def counts(self, *identities: str) -> List[int]:
+        """The current count for each identity, without counting a hit."""
+        window_keys = self._window_keys(identities)
+        keys = [
+            key for current, previous, _ in window_keys for key in (current, previous)
+        ]
+        client = self.get_redis_client()
+        if client is None:
+            found = cache.get_many(keys)
+            values = [found.get(key) for key in keys]
+        else:
+            values = client.mget(keys)
+
+        return [
+            self._estimate(values[i * 2], values[i * 2 + 1], weight)
+            for i, (_, _, weight) in enumerate(window_keys)
+        ]
+
+    def exceeded(self, *identities: str) -> bool:
+        return any(count >= self.limit for count in self.counts(*identities))
+
+    def reset(self, *identities: str) -> None:
+        keys = [
+            key
+            for current, previous, _ in self._window_keys(identities)
+            for key in (current, previous)
+        ]
+        client = self.get_redis_client()
+        if client is None:
+            cache.delete_many(keys)
+        else:
+            client.delete(*keys)
+
+    def _window_keys(self, identities) -> List[Tuple[str, str, float]]:
+        now = time.time()
+        index, offset = divmod(now, self.window)
+        weight = 1 - offset / self.window
+        return [
+            (
+                self._make_key(identity, int(index)),
+                self._make_key(identity, int(index) - 1),
+                weight,
+            )
+            for identity in identities
+        ]
+
+    def _make_key(self, identity: str, index: int) -> str:
+        key = f"throttle:{self.scope}:{identity}:{index}"
+        # the raw Redis client needs the backend's prefixed key
+        return cache.make_key(key) if self.get_redis_client() else key
+
+    @staticmethod
+    def _estimate(current, previous, weight: float) -> int:
+        # rounded up, so a window boundary never lets an extra hit through
+        return int(current or 0) + math.ceil(int(previous or 0) * weight)
+
+    def _hit_fallback(self, window_keys) -> List[int]:
+        counts = []
+        for current, previous, weight in window_keys:
+            cache.add(current, 0, timeout=self.window * 2)
+            counts.append(
+                self._estimate(cache.incr(current), cache.get(previous), weight)
+            )
+        return counts
+
+    @staticmethod
+    def get_redis_client():
+        if not isinstance(cache, RedisCache):
+            return None
+        return cache._cache.get_client(write=True)
+
+
+def throttle(scope: str, rate: str):
+    """
+    View decorator limiting each client IP to `rate` requests (e.g.
+    `"3/m"`), answering 429 beyond it. Use with method_decorator.
+    """
+    limiter = SlidingWindowThrottle.from_rate(scope, rate)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            (count,) = limiter.hit(get_client_ip(request))
+            if count > limiter.limit:
+                raise RateLimitException()
+            return view(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
@@ -1,4 +1,5 @@
 import decimal
+import hashlib
 import json
 import random
 import re
@@ -8,28 +9,32 @@ import uuid
 import datetime
 from datetime import date, timedelta
 from functools import wraps
+from io import BytesIO
 from math import ceil
 from typing import Dict, Optional, TypeVar, Union
+from urllib.parse import urlsplit
 from uuid import UUID, uuid4
 
 import phonenumbers
 import requests
 from django.conf import settings
-from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.wsgi import WSGIRequest
 from django.core.mail import EmailMessage, EmailMultiAlternatives
-from django.db.models import TextChoices, QuerySet
+from django.db.models import Count, Max, TextChoices, QuerySet
 from django.template import Context, Template
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.crypto import get_random_string
 from django.utils.html import strip_tags
+from django.utils.http import http_date
 from django.utils.text import slugify
 from django.utils.timezone import is_aware, make_aware
 from rest_framework import status
 from rest_framework.exceptions import APIException
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.request import Request
 from rest_framework.response import Response
 
 from accounts.models import UserTypes
@@ -37,7 +42,9 @@ from core.decorators import CustomApiPermissionRequired
 from core.errors.app_errors import OperationError
 from services.cache_util import CacheUtil
 from services.encryption_util import AESCipher
+from services.export import ExportFormat
 from services.log import AppLogger
+from services.pagination import CountedPageNumberPagination
 
 T = TypeVar("T")
 
@@ -59,6 +66,35 @@ class AnalyticsDuration(TextChoices):
     Yearly = "yearly"
 
 
+class PreRenderedResponse(Response):
+    """
+    A response whose body was rendered (and encrypted, when enabled) on an
+    earlier request. DRF sends the bytes as they are, without running a
+    serializer or renderer.
+    """
+
+    def __init__(self, content, content_type, etag=None, status=None):
+        super().__init__(status=status, content_type=content_type)
+        self._rendered_content = content
+        if etag:
+            self["ETag"] = etag
+
+    @property
+    def rendered_content(self):
+        return self._rendered_content
+
+    @property
+    def data(self):
+        # Decoded lazily, only for callers that inspect it (e.g. tests).
+        if self._data is None and self._rendered_content:
+            self._data = json.loads(self._rendered_content)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+
 class CustomAPIResponseUtil:
     encrypt_response = False
     app_enc_enabled = settings.APP_ENC_ENABLED
@@ -185,20 +221,12 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(o)
 
 
-class DefaultPagination(PageNumberPagination):
+class DefaultPagination(CountedPageNumberPagination):
     max_page_size = 1000
     page_size = 100
     page_query_param = "page"
     page_size_query_param = "page_size"
 
-    def get_paginated_response(self, data):
-        return Response({
-            'count': self.page.paginator.count,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'results': data
-        })
-
 
 def render_template_to_text(message, data=dict):
     context = Context(data)
@@ -334,7 +362,7 @@ class CustomAPIRequestUtil(DefaultPagination, CacheUtil):
         page = self.paginate_queryset(queryset, request=self.request)
         data = self.serializer_class(page, many=True).data
 
-        return self.get_paginated_list_response(data, queryset.count())
+        return self.get_paginated_list_response(data, self.get_paginated_total())
 
     def is_numeric(self, value):
         if value:
@@ -347,6 +375,17 @@ class CustomAPIRequestUtil(DefaultPagination, CacheUtil):
 
     def __get_pagination_data(self, total, data):
         prev_page_no = int(self.current_page) - 1
+        if total is None:
+            # The count was skipped; the page itself knows its neighbours.
+            return (
+                prev_page_no,
+                data,
+                total,
+                None,
+                self.page.has_next(),
+                self.page.has_previous(),
+            )
+
         last_page = ceil(total / self.page_size) if self.page_size > 0 else 0
         has_next_page = (
             total > 0
@@ -396,7 +435,7 @@ class CustomAPIRequestUtil(DefaultPagination, CacheUtil):
         return {
             "page_size": self.page_size,
             "current_page": self.current_page
-            if self.current_page <= last_page
+            if last_page is None or self.current_page <= last_page
             else last_page,
             "last_page": last_page,
             "total": total,
@@ -524,6 +563,10 @@ class CustomApiRequestProcessorBase(
             else:
                 response_raw_data: Union[tuple, T] = target_function(**extra_args)
                 return self.__handle_request_response(response_raw_data)
+        except APIException:
+            # answered by DRF, e.g. 404 for an invalid page or cursor and
+            # 503 with Retry-After for ServiceBusyException
+            raise
         except Exception as e:
             AppLogger.report(e)
 
@@ -606,6 +649,123 @@ class CustomApiRequestProcessorBase(
     #         )
         
 
+    def process_cached_request(
+        self,
+        request,
+        target_function,
+        cache_key,
+        timeout=None,
+        validators=None,
+        **extra_args,
+    ):
+        """
+        process_request for read endpoints whose response is the same for
+        every caller. The final response bytes are cached under
+        `response:<cache_key>` and replayed as-is on later requests.
+
+        `validators` returns `(stamp, last_modified)` for the current state
+        of the data, cheaply (e.g. from an aggregate query). A cached
+        response built under another stamp is rebuilt. The stamp is not
+        sent: the body can come from data caches lagging the database, so
+        the ETag is the hash of the bytes served and Last-Modified (sent
+        when `last_modified` is) only moves when those bytes change. A
+        matching If-None-Match or If-Modified-Since gets a bodiless 304.
+        """
+        renderer = getattr(request, "accepted_renderer", None)
+        if getattr(renderer, "format", None) != "json":
+            return self.process_request(request, target_function, **extra_args)
+
+        self.check_required_roles_and_permissions()
+
+        stamp, last_modified = validators() if validators else (None, None)
+        response_cache_key = self.generate_response_cache_key(cache_key)
+        cached_response = self.get_cache_value(response_cache_key)
+        previous = None
+        if cached_response and cached_response.get("stamp") != stamp:
+            previous, cached_response = cached_response, None
+
+        if not cached_response:
+            response = self.process_request(request, target_function, **extra_args)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+            # Plain media type, so a client asking for `indent=4` cannot
+            # decide what everyone else is served.
+            content = renderer.render(
+                response.data, renderer.media_type, {"request": request}
+            )
+            etag = '"{}"'.format(hashlib.md5(content).hexdigest())
+            if previous and previous["etag"] == etag:
+                last_modified = previous.get("last_modified")
+            elif last_modified:
+                last_modified = timezone.now()
+            cached_response = {
+                "content": content,
+                "content_type": renderer.media_type,
+                "etag": etag,
+                "stamp": stamp,
+                "last_modified": last_modified,
+            }
+            self.set_cache_value(response_cache_key, cached_response, timeout=timeout)
+
+        etag = cached_response["etag"]
+        last_modified = cached_response.get("last_modified")
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if not_modified is not None:
+            return self.set_validators(not_modified, etag, last_modified)
+
+        return self.set_validators(
+            PreRenderedResponse(
+                cached_response["content"], cached_response["content_type"]
+            ),
+            etag,
+            last_modified,
+        )
+
+    @staticmethod
+    def set_validators(response, etag=None, last_modified=None):
+        if etag:
+            response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
+
+    def process_export_request(self, request, target_function, **extra_args):
+        """
+        process_request for exports: `target_function` returns a
+        `(RowsExport, error)` tuple and the export is streamed in the
+        `?file_format=` the client asks for (ndjson by default, or csv).
+        """
+        self.check_required_roles_and_permissions()
+
+        export_format = request.query_params.get("file_format", ExportFormat.ndjson)
+        if export_format not in ExportFormat.values:
+            return self.response_with_error(
+                {"file_format": f"Choose one of: {', '.join(ExportFormat.values)}"}
+            )
+
+        try:
+            export, error_detail = target_function(**extra_args)
+        except Exception as e:
+            AppLogger.report(e)
+
+            response_data = {"error": str(e), "message": "Server error"}
+            return self.response_with_json(
+                response_data, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        if error_detail:
+            return self.__handle_request_response((None, error_detail))
+
+        cipher = None
+        if self.app_enc_enabled or self.response_payload_requires_encryption:
+            cipher = AESCipher(settings.APP_ENC_KEY, settings.APP_ENC_VEC)
+        return export.streaming_response(export_format, cipher)
+
     def __handle_request_response(self, response_raw_data):
         response_data, error_detail = None, None
         if isinstance(response_raw_data, tuple):
@@ -692,6 +852,50 @@ def check_tenant_from_payload_or_query_string(request):
     return ""
 
 
+def get_list_validators(queryset, *salt, last_modified=False):
+    """
+    `(stamp, last_modified)` for a list read from `queryset` (of BaseModel
+    rows), from one aggregate query, for process_cached_request: edits
+    move the latest `updated_at`, deletions change the count. `salt`
+    (e.g. the page's cache key) tells apart the representations served
+    from the same rows.
+
+    Deleting a row never moves the latest `updated_at`, so only the stamp
+    can tell a list shrank; `last_modified` is returned only when asked
+    for, for querysets of a single row (a detail).
+    """
+    stats = queryset.order_by().aggregate(
+        last_modified=Max("updated_at"), count=Count("pk")
+    )
+    signature = f"{salt}:{stats['last_modified']}:{stats['count']}"
+    stamp = hashlib.md5(signature.encode()).hexdigest()
+    return stamp, stats["last_modified"] if last_modified else None
+
+
+def make_background_request(url):
+    """
+    An anonymous GET request for `url`, for running request-bound service
+    code (pagination links, query params) outside a request, e.g. in Celery.
+    """
+    parts = urlsplit(url)
+    http_request = WSGIRequest(
+        {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": parts.path or "/",
+            "QUERY_STRING": parts.query,
+            "HTTP_HOST": parts.netloc,
+            "SERVER_NAME": parts.hostname or "localhost",
+            "SERVER_PORT": str(parts.port or (443 if parts.scheme == "https" else 80)),
+            "wsgi.url_scheme": parts.scheme or "http",
+            "wsgi.input": BytesIO(),
+        }
+    )
+
+    request = Request(http_request)
+    request.user = AnonymousUser()
+    return request
+
+
 def generate_ref():
     _id = uuid4().fields
 
@@ -839,17 +1043,6 @@ def permission_or_client_type_required(permission, *client_types):
     return decorator
 
 
-def generate_otp():
-    if settings.DEBUG == True:
-        otp = "123456"
-    else:
-        otp = str(random.randint(1, 999999)).zfill(6)
-
-    hashed_otp = make_password(otp)
-
-    return otp, hashed_otp
-
-
 def check_otp_time_expired(otp_requested_at, duration=10, use_pyotp=False):
     if not is_aware(otp_requested_at):
         otp_requested_at = make_aware(otp_requested_at)
@@ -862,10 +1055,6 @@ def check_otp_time_expired(otp_requested_at, duration=10, use_pyotp=False):
     return time_difference_minutes > duration
 
 
-def compare_password(input_password, hashed_password):
-    return check_password(input_password, hashed_password)
-
-
 def is_valid_file_extension(file_extension):
     recognized_file_extension_list = [
         ".pdf",
@@ -0,0 +1,141 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils.timezone import is_aware
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Fields whose to_representation returns a database value unchanged.
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+FieldPlan = List[Tuple[str, str, Optional[serializers.Field]]]
+
+
+def bind_representation(field: serializers.Field) -> Callable[[Any], Any]:
+    """
+    `field.to_representation`, except for ISO 8601 datetimes, where the
+    output timezone is looked up once here rather than for every value.
+    """
+    if not isinstance(field, serializers.DateTimeField):
+        return field.to_representation
+
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    output_timezone = (
+        field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    )
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    if output_timezone is None:
+        return field.to_representation
+
+    def to_representation(value):
+        if not isinstance(value, datetime) or not is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(output_timezone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return to_representation
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for a ModelSerializer of plain model fields
+    (`serializer_class`): rows come from `queryset.values()` and are turned
+    into the same dicts the ModelSerializer would produce, without model
+    instances or per-field `get_attribute` calls.
+
+    The field plan, `(name, lookup, field or None)` per field, is compiled
+    once per class from the ModelSerializer's own fields, whose
+    to_representation is reused, so formats (datetimes, decimals, uuids)
+    stay identical. None marks fields whose values pass through as-is.
+    Call it like a serializer: `FastSerializer(rows, many=True).data`.
+    """
+
+    serializer_class = None
+
+    def __init__(self, instance=None, many=False, fields: Optional[Iterable] = None):
+        self.instance = instance
+        self.many = many
+        self.fields = fields
+
+    @property
+    def data(self):
+        plan = [
+            (name, lookup, field and bind_representation(field))
+            for name, lookup, field in self.get_plan(self.fields)
+        ]
+        if self.many:
+            return [self.to_representation(row, plan) for row in self.instance]
+        return self.to_representation(self.instance, plan)
+
+    @staticmethod
+    def to_representation(row: Dict[str, Any], plan) -> Dict[str, Any]:
+        ret = {}
+        for name, lookup, to_representation in plan:
+            value = row[lookup]
+            ret[name] = (
+                value
+                if to_representation is None or value is None
+                else to_representation(value)
+            )
+        return ret
+
+    @classmethod
+    def get_plan(cls, fields: Optional[Iterable] = None) -> FieldPlan:
+        if "_plan" not in cls.__dict__:
+            cls._plan = cls.compile_plan()
+        if fields is None:
+            return cls._plan
+        return [step for step in cls._plan if step[0] in fields]
+
+    @classmethod
+    def compile_plan(cls) -> FieldPlan:
+        model = cls.serializer_class.Meta.model
+        plan = []
+        for name, field in cls.serializer_class().fields.items():
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{cls.__name__}: `{name}` is not a model field"
+                )
+            if not model_field.concrete:
+                raise ImproperlyConfigured(
+                    f"{cls.__name__}: `{name}` has no column of its own"
+                )
+
+            passthrough = isinstance(field, PASSTHROUGH_FIELDS)
+            plan.append(
+                (
+                    name,
+                    model_field.attname,
+                    None if passthrough else field,
+                )
+            )
+
+        return plan
+
+    @classmethod
+    def get_values_queryset(cls, queryset, fields=None, extra: Iterable[str] = ()):
+        """`queryset.values()` of the columns the plan (and `extra`) reads."""
+        lookups = [lookup for _, lookup, _ in cls.get_plan(fields)]
+        lookups += [field.lstrip("-") for field in extra]
+        return queryset.values(*dict.fromkeys(lookups))
+
+    # Sparse fieldsets are validated by the ModelSerializer being mirrored.
+    @classmethod
+    def get_unknown_fields(cls, request) -> List[str]:
+        return cls.serializer_class.get_unknown_fields(request)
+
+    @classmethod
+    def get_requested_fields(cls, request) -> Optional[List[str]]:
+        return cls.serializer_class.get_requested_fields(request)
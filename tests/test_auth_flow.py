@@ -1,13 +1,25 @@
 # tests/test_auth_flow.py
 import random
+import threading
+import time
 import string
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from django.test import override_settings
+from django.test import RequestFactory, override_settings
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from unittest.mock import patch
 
-from accounts.models import User, UserTypes, RegisterLog
+from accounts.models import DeviceToken, User, UserTypes, RegisterLog
+from accounts.services.auth import AuthService
+from accounts.services.users import UserService
+from core.exceptions.custom_exception_handler import ServiceBusyException
+from accounts.serializers.auth import LoginSerializer, OTPSerializer, login_failures
+from courses.models import Course, Enrollment
+from services.password_hashing import password_hashing_pool
+from services.throttle import get_client_ip
 
 
 def generate_test_user():
@@ -30,6 +42,7 @@ class AuthFlowTests(APITestCase):
         patcher_email = patch('accounts.tasks.send_activation_otp_email_queue.delay', lambda *args, **kwargs: None)
         self.addCleanup(patcher_email.stop)
         patcher_email.start()
+        cache.clear()  # signup and verify-otp are rate limited per IP
 
         # Register a student once
         self.client = APIClient()
@@ -80,3 +93,206 @@ class AuthFlowTests(APITestCase):
         self.assertEqual(login_resp.status_code, status.HTTP_200_OK)
         self.assertIn("access_token", login_resp.data)
         self.assertIn("refresh_token", login_resp.data)
+
+    def test_register_otp_is_locked_after_too_many_wrong_guesses(self):
+        email = f"otp_{self.user_data['username']}@example.com".lower()
+        cache.clear()
+        self.client.post(
+            reverse("signup"),
+            {"email": email, "full_name": "Otp Tester", "password": self.user_data["password"]}
+        )
+        log = RegisterLog.objects.get(email=email)
+        self.assertNotIn("123456", log.otp)
+        self.assertIsNotNone(log.otp_expires_at)
+
+        with override_settings(OTP_MAX_ATTEMPTS=2):
+            for _ in range(2):
+                resp = self.client.post(reverse("verify-otp"), {"email": email, "otp": "000000"})
+                self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            # the right OTP no longer helps once the attempts are used up
+            resp = self.client.post(reverse("verify-otp"), {"email": email, "otp": "123456"})
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("expired", str(resp.data))
+
+        log.refresh_from_db()
+        self.assertEqual(log.otp_attempts, 2)
+        self.assertFalse(User.objects.filter(email=email).exists())
+
+    def test_push_token_moves_to_the_user_who_signs_in_with_it(self):
+        first = User.objects.get(email=self.student_email)
+        second = User.objects.create_user(
+            username=f"{first.username}_2", email=f"2_{first.email}", password="x"
+        )
+
+        AuthService.update_last_login(first, "device-token-1")
+        self.assertEqual(first.fcm_token, "device-token-1")
+
+        with self.assertNumQueries(2):
+            AuthService.update_last_login(second, "device-token-1")
+        self.assertIsNone(first.fcm_token)
+        self.assertEqual(second.fcm_token, "device-token-1")
+        self.assertEqual(DeviceToken.objects.filter(token="device-token-1").count(), 1)
+
+        AuthService.update_last_login(second, "device-token-2")
+        self.assertEqual(second.fcm_token, "device-token-2")
+        self.assertCountEqual(
+            UserService.fetch_fcm_tokens([first.pk, second.pk]),
+            ["device-token-1", "device-token-2"],
+        )
+
+        # tokens longer than the column are rejected before they reach it
+        serializer = OTPSerializer(
+            data={"email": first.email, "otp": "123456", "fcm_token": "t" * 513}
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("fcm_token", serializer.errors)
+
+    def test_authenticated_requests_resolve_the_user_from_the_cache(self):
+        login_resp = self.client.post(
+            reverse("login"),
+            {"username": self.student_email, "password": self.user_data["password"]}
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {login_resp.data['access_token']}")
+        user = User.objects.get(email=self.student_email)
+        teacher = User.objects.create_user(
+            username=f"{user.username}_t", email=f"t_{user.email}", password="x",
+            user_type=UserTypes.teacher,
+        )
+        course = Course.objects.create(
+            title="Enrolled", description="Desc", teacher=teacher, slug=f"{user.username}-course"
+        )
+        Enrollment.objects.create(student=user, course=course)
+        UserService(None).clear_temp_cache(user)
+
+        def user_queries():
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(reverse("list-enrollments"))
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            return [q["sql"] for q in queries if 'FROM "accounts_user"' in q["sql"]]
+
+        self.assertEqual(len(user_queries()), 1)
+        self.assertEqual(user_queries(), [])
+        # the enrollments page itself (its total is cached), nothing for the user
+        with self.assertNumQueries(1):
+            self.client.get(reverse("list-enrollments"))
+
+        # every column but the password hash is at hand without a query
+        cached_user = UserService.user_from_auth_snapshot(UserService.get_auth_snapshot(user.pk))
+        with self.assertNumQueries(0):
+            for field in User._meta.concrete_fields:
+                if field.attname != "password":
+                    self.assertEqual(getattr(cached_user, field.attname), getattr(user, field.attname))
+
+        # changes made through UserService drop the snapshot
+        User.objects.filter(pk=user.pk).update(user_type=UserTypes.teacher)
+        UserService(None).clear_temp_cache(user)
+        self.assertEqual(len(user_queries()), 1)
+        snapshot = UserService.get_auth_snapshot(user.pk)
+        self.assertEqual(snapshot["user_type"], UserTypes.teacher)
+
+    def test_login_is_throttled_per_ip_and_failed_logins_per_username(self):
+        cache.clear()
+        for _ in range(3):
+            resp = self.client.post(
+                reverse("login"), {"username": self.student_email, "password": "wrong"}
+            )
+            self.assertEqual(resp.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        resp = self.client.post(
+            reverse("login"), {"username": self.student_email, "password": "wrong"}
+        )
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        def login(password, ip="10.0.0.1"):
+            request = RequestFactory().post("/", REMOTE_ADDR=ip)
+            serializer = LoginSerializer(
+                data={"username": self.student_email, "password": password},
+                context={"request": request},
+            )
+            return serializer.is_valid()
+
+        cache.clear()
+        with override_settings(LOGIN_THROTTLE_USER_FAILURES=4):
+            for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+                self.assertFalse(login("wrong", ip))
+            self.assertTrue(login(self.user_data["password"], "10.0.0.4"))
+            # every attempt is counted before the password is checked, a right one is refunded
+            self.assertEqual(
+                login_failures.counts(f"user:{self.student_email}", "ip:10.0.0.4"), [3, 0]
+            )
+            self.assertFalse(login("wrong", "10.0.0.5"))
+            # the username is locked out whichever IP the right password comes from
+            self.assertFalse(login(self.user_data["password"], "10.0.0.6"))
+
+    def test_client_ip_is_read_behind_the_trusted_proxies_only(self):
+        request = RequestFactory().get(
+            "/", REMOTE_ADDR="10.0.0.9", HTTP_X_FORWARDED_FOR="6.6.6.6, 1.2.3.4, 10.0.0.8"
+        )
+        self.assertEqual(get_client_ip(request), "10.0.0.9")
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            self.assertEqual(get_client_ip(request), "10.0.0.8")
+        with override_settings(TRUSTED_PROXY_COUNT=2):
+            # the forged leftmost entry is never used
+            self.assertEqual(get_client_ip(request), "1.2.3.4")
+        with override_settings(TRUSTED_PROXY_COUNT=4):
+            self.assertEqual(get_client_ip(request), "10.0.0.9")
+
+    def test_logins_get_503_while_the_password_hashing_pool_is_full(self):
+        cache.clear()
+        release = threading.Event()
+        blockers = []
+        try:
+            with override_settings(
+                GUNICORN_THREADS=3, PASSWORD_HASHING_WORKERS=2,
+                PASSWORD_HASHING_QUEUE=4, PASSWORD_HASHING_TIMEOUT=30,
+            ):
+                # a request thread is always left for other traffic
+                self.assertEqual(password_hashing_pool.get_slot_count(), 2)
+                password_hashing_pool._pid = None  # rebuild with the small limits
+                blockers = [password_hashing_pool.submit(release.wait) for _ in range(2)]
+                started = time.monotonic()
+                resp = self.client.post(
+                    reverse("login"),
+                    {"username": self.student_email, "password": self.user_data["password"]}
+                )
+                self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+                self.assertEqual(resp["Retry-After"], "2")
+                # refused on the slot check, not after waiting out the timeout
+                self.assertLess(time.monotonic() - started, 5)
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+            password_hashing_pool._pid = None
+
+        resp = self.client.post(
+            reverse("login"),
+            {"username": self.student_email, "password": self.user_data["password"]}
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_in_app_password_change_hashes_on_the_pool(self):
+        user = User.objects.get(email=self.student_email)
+        payload = {
+            "user": user,
+            "current_password": self.user_data["password"],
+            "new_password": f"{self.user_data['password']}-new",
+        }
+        release = threading.Event()
+        blockers = []
+        try:
+            with override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE=1):
+                password_hashing_pool._pid = None  # rebuild with the small limits
+                blockers = [password_hashing_pool.submit(release.wait) for _ in range(2)]
+                with self.assertRaises(ServiceBusyException):
+                    AuthService(None).reset_password_in_app(payload)
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+            password_hashing_pool._pid = None
+
+        data, error = AuthService(None).reset_password_in_app(payload)
+        self.assertIsNone(error)
+        self.assertEqual(data, {"message": "Password updated successfully."})
+        user.refresh_from_db()
+        self.assertTrue(user.check_password(payload["new_password"]))
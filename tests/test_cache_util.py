@@ -0,0 +1,500 @@
+# tests/test_cache_util.py
+
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User, UserTypes
+from courses.models import Course
+from courses.services.course_service import CourseService
+
+from services.cache_util import (
+    COMPRESSED_ENTRY_HEADER,
+    CacheEntry,
+    CacheUtil,
+    LocalCache,
+    cache_stats,
+)
+from services.cache_metrics import render_cache_metrics
+from services.cache_warmer import CacheWarmer
+
+
+class LocalCacheTestCase(TestCase):
+    def setUp(self):
+        self.local_cache = LocalCache(max_entries=2, timeout=60)
+
+    def test_returns_a_copy_of_the_stored_value(self):
+        value = {"id": 1, "title": "Course"}
+        self.local_cache.set("course_detail:1", value)
+
+        cached = self.local_cache.get("course_detail:1")
+        self.assertEqual(cached, value)
+        self.assertIsNot(cached, value)
+
+    def test_evicts_least_recently_used_entry(self):
+        self.local_cache.set("a", 1)
+        self.local_cache.set("b", 2)
+        self.local_cache.get("a")
+        self.local_cache.set("c", 3)
+
+        self.assertEqual(self.local_cache.get("a"), 1)
+        self.assertIsNone(self.local_cache.get("b"))
+        self.assertEqual(self.local_cache.get("c"), 3)
+
+    def test_expired_entries_are_not_served(self):
+        self.local_cache.set("a", 1, timeout=0)
+        self.assertIsNone(self.local_cache.get("a"))
+
+    def test_set_is_skipped_when_an_invalidation_raced_the_read(self):
+        generation = self.local_cache.generation
+        self.local_cache.delete("a")
+        self.local_cache.set("a", "stale", generation=generation)
+
+        self.assertIsNone(self.local_cache.get("a"))
+
+
+@override_settings(CACHE_L1_ENABLED=True)
+class CacheUtilLocalTierTestCase(TestCase):
+    def setUp(self):
+        CacheUtil.clear_local_cache()
+        cache.clear()
+
+    def test_clear_cache_evicts_both_tiers(self):
+        key = CacheUtil.generate_cache_key("course_detail", 1)
+        CacheUtil.set_cache_value(key, {"id": 1}, timeout=300)
+        self.assertEqual(CacheUtil.get_cache_value(key), {"id": 1})
+
+        CacheUtil.clear_cache(key)
+
+        self.assertIsNone(cache.get(key))
+        self.assertIsNone(CacheUtil.get_cache_value(key))
+
+    def test_loader_result_is_served_without_calling_loader_again(self):
+        key = CacheUtil.generate_cache_key("course_detail", 2)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {"id": 2}, None
+
+        CacheUtil.get_cache_value_or_default(key, loader, timeout=300)
+        data, error = CacheUtil.get_cache_value_or_default(key, loader, timeout=300)
+
+        self.assertEqual(data, {"id": 2})
+        self.assertIsNone(error)
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(CACHE_LOCK_WAIT=0.2)
+class CacheUtilSingleFlightTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+        self.key = CacheUtil.generate_cache_key("published_courses_list")
+
+    def test_falls_back_to_loading_when_lock_holder_is_too_slow(self):
+        cache.add(f"lock:{self.key}", "someone-else", timeout=10)
+
+        data, _ = CacheUtil.get_cache_value_or_default(
+            self.key, lambda: (["fresh"], None), timeout=300, single_flight=True
+        )
+
+        self.assertEqual(data, ["fresh"])
+        self.assertEqual(cache_stats.snapshot().get("lock_wait_timeouts"), 1)
+
+    def test_waiter_picks_up_value_loaded_by_lock_holder(self):
+        cache.add(f"lock:{self.key}", "someone-else", timeout=10)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return ["fresh"], None
+
+        original_sleep = time.sleep
+
+        def sleep_then_publish(seconds):
+            # Simulates the lock holder finishing while we wait.
+            cache.set(self.key, CacheEntry(["loaded-elsewhere"], time.time() + 300))
+            original_sleep(seconds)
+
+        with patch("services.cache_util.time.sleep", sleep_then_publish):
+            data, _ = CacheUtil.get_cache_value_or_default(
+                self.key, loader, timeout=300, single_flight=True
+            )
+
+        self.assertEqual(data, ["loaded-elsewhere"])
+        self.assertEqual(calls, [])
+        self.assertEqual(cache_stats.snapshot().get("collapsed_loader_calls"), 1)
+
+    def test_early_recompute_serves_current_value_while_locked(self):
+        cache.set(self.key, CacheEntry(["current"], time.time() + 1, delta=60))
+        cache.add(f"lock:{self.key}", "someone-else", timeout=10)
+
+        data, _ = CacheUtil.get_cache_value_or_default(
+            self.key,
+            lambda: (["fresh"], None),
+            timeout=300,
+            single_flight=True,
+            early_recompute=True,
+        )
+
+        self.assertEqual(data, ["current"])
+        stats = cache_stats.snapshot()
+        self.assertEqual(stats.get("early_recomputes"), 1)
+        self.assertEqual(stats.get("collapsed_loader_calls"), 1)
+
+    def test_lock_holder_loads_and_releases_lock(self):
+        data, _ = CacheUtil.get_cache_value_or_default(
+            self.key, lambda: (["fresh"], None), timeout=300, single_flight=True
+        )
+
+        self.assertEqual(data, ["fresh"])
+        self.assertEqual(CacheUtil.get_cache_value(self.key), ["fresh"])
+        self.assertIsNone(cache.get(f"lock:{self.key}"))
+
+
+class CacheUtilNegativeCachingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def loader(self, result):
+        def _loader():
+            self.calls.append(1)
+            return result
+
+        return _loader
+
+    def test_empty_results_are_cached(self):
+        key = CacheUtil.generate_cache_key("assignments_list", 1)
+        loader = self.loader(([], None))
+
+        CacheUtil.get_cache_value_or_default(key, loader, timeout=300)
+        data, error = CacheUtil.get_cache_value_or_default(key, loader, timeout=300)
+
+        self.assertEqual(data, [])
+        self.assertIsNone(error)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_not_found_is_cached_with_its_error(self):
+        key = CacheUtil.generate_cache_key("course_detail", 999)
+        loader = self.loader((None, "Course not found."))
+
+        CacheUtil.get_cache_value_or_default(key, loader, timeout=300)
+        data, error = CacheUtil.get_cache_value_or_default(key, loader, timeout=300)
+
+        self.assertIsNone(data)
+        self.assertEqual(error, "Course not found.")
+        self.assertEqual(len(self.calls), 1)
+
+    @override_settings(CACHE_NEGATIVE_TIMEOUT=30)
+    def test_not_found_uses_the_shorter_timeout(self):
+        key = CacheUtil.generate_cache_key("course_detail", 998)
+        CacheUtil.get_cache_value_or_default(
+            key, self.loader((None, "Course not found.")), timeout=300
+        )
+
+        entry = CacheUtil.get_cache_entry(key)
+        self.assertLessEqual(entry.expires_at, time.time() + 30)
+
+    def test_negative_caching_can_be_disabled(self):
+        key = CacheUtil.generate_cache_key("course_detail", 997)
+        loader = self.loader((None, "Course not found."))
+
+        CacheUtil.get_cache_value_or_default(key, loader, negative_timeout=0)
+        CacheUtil.get_cache_value_or_default(key, loader, negative_timeout=0)
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertIsNone(CacheUtil.get_cache_entry(key))
+
+
+class CacheUtilNamespaceTestCase(TestCase):
+    def test_params_are_normalized(self):
+        first = CacheUtil.generate_namespaced_cache_key("courses", page=2, page_size=20)
+        second = CacheUtil.generate_namespaced_cache_key(
+            "courses", page_size=20, page=2, keyword=None
+        )
+        self.assertEqual(first, second)
+
+    def test_bump_invalidates_every_key_in_the_namespace(self):
+        keys = [
+            CacheUtil.generate_namespaced_cache_key("assignments_list:1", page=page)
+            for page in (1, 2)
+        ]
+        for key in keys:
+            CacheUtil.set_cache_value(key, ["page"], timeout=300)
+
+        CacheUtil.bump_namespace("assignments_list:1")
+
+        for page, key in zip((1, 2), keys):
+            new_key = CacheUtil.generate_namespaced_cache_key(
+                "assignments_list:1", page=page
+            )
+            self.assertNotEqual(new_key, key)
+            self.assertIsNone(CacheUtil.get_cache_entry(new_key))
+
+    def test_bump_recovers_from_a_lost_version_key(self):
+        cache.delete("ns:lost")
+        CacheUtil.bump_namespace("lost")
+        self.assertIsNotNone(CacheUtil.get_namespace_version("lost"))
+
+
+class CacheUtilBulkTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_get_many_returns_only_cached_keys(self):
+        CacheUtil.set_many({"a:1": [1], "a:2": []}, timeout=300)
+
+        entries = CacheUtil.get_many("a:1", "a:2", "a:3")
+
+        self.assertEqual(entries["a:1"].value, [1])
+        self.assertEqual(entries["a:2"].value, [])
+        self.assertNotIn("a:3", entries)
+
+    def test_get_many_or_default_only_runs_missing_loaders(self):
+        CacheUtil.set_cache_value("user:1:perms:names", ["view"], timeout=300)
+        calls = []
+
+        def loader(value):
+            def _loader():
+                calls.append(value)
+                return value, None
+
+            return _loader
+
+        results = CacheUtil.get_many_or_default(
+            {
+                "user:1:perms:names": loader(["never"]),
+                "user:1:roles:names": loader(["Teacher"]),
+            },
+            timeout=300,
+        )
+
+        self.assertEqual(results["user:1:perms:names"], (["view"], None))
+        self.assertEqual(results["user:1:roles:names"], (["Teacher"], None))
+        self.assertEqual(calls, [["Teacher"]])
+        self.assertEqual(CacheUtil.get_cache_value("user:1:roles:names"), ["Teacher"])
+
+
+@override_settings(CACHE_COMPRESS_MIN_SIZE=1024)
+class CacheUtilCompressionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+
+    def test_large_values_are_stored_compressed_and_read_back(self):
+        key = CacheUtil.generate_cache_key("course_detail", 1)
+        value = {"id": 1, "description": "Lorem ipsum dolor sit amet. " * 200}
+
+        CacheUtil.set_cache_value(key, value, timeout=300)
+
+        stored = cache.get(key)
+        self.assertIsInstance(stored, bytes)
+        self.assertTrue(stored.startswith(COMPRESSED_ENTRY_HEADER))
+        self.assertEqual(CacheUtil.get_cache_value(key), value)
+        self.assertEqual(CacheUtil.get_many(key)[key].value, value)
+
+    def test_small_values_are_stored_as_is(self):
+        key = CacheUtil.generate_cache_key("course_detail", 2)
+        CacheUtil.set_cache_value(key, {"id": 2}, timeout=300)
+
+        self.assertIsInstance(cache.get(key), CacheEntry)
+
+    @override_settings(CACHE_COMPRESS_MIN_SIZE=0)
+    def test_compression_can_be_disabled(self):
+        key = CacheUtil.generate_cache_key("course_detail", 3)
+        CacheUtil.set_cache_value(key, "x" * 10000, timeout=300)
+
+        self.assertIsInstance(cache.get(key), CacheEntry)
+
+    def test_bytes_saved_are_reported_per_key_family(self):
+        CacheUtil.set_many(
+            {
+                "lessons_list:1": ["Lesson content. " * 200],
+                "course_detail:4": {"id": 4},
+            },
+            timeout=300,
+        )
+
+        stats = CacheUtil.get_compression_stats()
+
+        self.assertEqual(list(stats), ["lessons_list"])
+        self.assertEqual(stats["lessons_list"]["compressed_writes"], 1)
+        self.assertGreater(stats["lessons_list"]["bytes_saved"], 0)
+        self.assertLess(stats["lessons_list"]["ratio"], 1)
+
+
+def load_refreshed_value(value):
+    return value, None
+
+
+class CacheUtilStaleWhileRevalidateTestCase(TestCase):
+    loader_path = "tests.test_cache_util:load_refreshed_value"
+
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+        self.key = CacheUtil.generate_cache_key("course_detail", 1)
+        self.background_refresh = (self.loader_path, {"value": {"id": 1, "v": 2}})
+
+    def read(self):
+        return CacheUtil.get_cache_value_or_default(
+            self.key,
+            lambda: ({"id": 1, "v": 2}, None),
+            timeout=300,
+            soft_timeout=60,
+            background_refresh=self.background_refresh,
+        )
+
+    def make_stale(self):
+        cache.set(
+            self.key,
+            CacheEntry({"id": 1, "v": 1}, time.time() + 240, stale_at=time.time() - 1),
+        )
+
+    @patch("core.tasks.refresh_cache_value_queue.delay")
+    def test_fresh_value_is_served_without_refreshing(self, delay):
+        self.read()
+        data, _ = self.read()
+
+        self.assertEqual(data, {"id": 1, "v": 2})
+        self.assertGreater(CacheUtil.get_cache_entry(self.key).stale_at, time.time())
+        delay.assert_not_called()
+
+    @patch("core.tasks.refresh_cache_value_queue.delay")
+    def test_stale_value_is_served_while_a_single_refresh_is_queued(self, delay):
+        self.make_stale()
+
+        first, _ = self.read()
+        second, _ = self.read()
+
+        self.assertEqual(first, {"id": 1, "v": 1})
+        self.assertEqual(second, {"id": 1, "v": 1})
+        delay.assert_called_once_with(
+            self.key, self.loader_path, {"value": {"id": 1, "v": 2}}, 300, 60
+        )
+
+    def test_refresh_replaces_the_value_and_its_rendered_response(self):
+        self.make_stale()
+        response_key = CacheUtil.generate_response_cache_key(self.key)
+        CacheUtil.set_cache_value(response_key, {"content": b"{}"}, timeout=300)
+        cache.add(f"refresh:{self.key}", 1)
+
+        CacheUtil.refresh_cache_value(
+            self.key, self.loader_path, {"value": {"id": 1, "v": 2}}, 300, 60
+        )
+
+        entry = CacheUtil.get_cache_entry(self.key)
+        self.assertEqual(entry.value, {"id": 1, "v": 2})
+        self.assertFalse(entry.is_stale())
+        self.assertIsNone(CacheUtil.get_cache_entry(response_key))
+        self.assertIsNone(cache.get(f"refresh:{self.key}"))
+
+    def test_refresh_does_not_resurrect_an_invalidated_key(self):
+        CacheUtil.refresh_cache_value(
+            self.key, self.loader_path, {"value": {"id": 1, "v": 2}}, 300, 60
+        )
+
+        self.assertIsNone(CacheUtil.get_cache_entry(self.key))
+
+
+class CacheWarmerTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            username="warmteacher",
+            email="warm.teacher@example.com",
+            password="Pass1234!",
+            user_type=UserTypes.teacher,
+            last_login=timezone.now(),
+        )
+        self.courses = [
+            Course.objects.create(
+                title=f"Course {i}",
+                description="Desc",
+                teacher=self.teacher,
+                is_published=True,
+                slug=f"warm-course-{i}",
+            )
+            for i in range(3)
+        ]
+
+    def test_warms_the_most_recently_active_courses_and_users(self):
+        results = CacheWarmer(courses=2, users=5, concurrency=2).warm()
+
+        # course list + 3 keys per course + 1 user
+        self.assertEqual(results, {"warmed": 8, "failed": 0})
+
+        warmed_ids = {course.id for course in self.courses[1:]}
+        for course in self.courses:
+            entry = CacheUtil.get_cache_entry(
+                CourseService.course_detail_cache_key(course.id)
+            )
+            self.assertEqual(entry is not None, course.id in warmed_ids)
+
+        perms_key = CacheUtil.generate_cache_key(
+            "user", self.teacher.id, "perms", "names"
+        )
+        self.assertIsNotNone(CacheUtil.get_cache_entry(perms_key))
+
+
+class CacheMetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+
+    def test_hits_misses_and_loader_latency_are_counted_per_family(self):
+        key = CacheUtil.generate_cache_key("course_detail", 1)
+        CacheUtil.get_cache_value_or_default(key, lambda: ({"id": 1}, None))
+        CacheUtil.get_cache_value_or_default(key, lambda: ({"id": 1}, None))
+
+        stats = CacheUtil.get_family_stats()["course_detail"]
+
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["loader_calls"], 1)
+        self.assertEqual(stats["loader_seconds_count"], 1)
+        self.assertEqual(stats["value_bytes_count"], 1)
+
+    def test_renders_prometheus_text(self):
+        text = render_cache_metrics(
+            {
+                "course_detail": {
+                    "hits": 3,
+                    "loader_seconds_bucket:0.005": 1,
+                    "loader_seconds_bucket:0.5": 1,
+                    "loader_seconds_sum": 0.25,
+                    "loader_seconds_count": 2,
+                }
+            }
+        )
+
+        self.assertIn('edutrack_cache_hits_total{family="course_detail"} 3', text)
+        self.assertIn("# TYPE edutrack_cache_loader_seconds histogram", text)
+        self.assertIn(
+            'edutrack_cache_loader_seconds_bucket{family="course_detail",le="0.5"} 2',
+            text,
+        )
+        self.assertIn(
+            'edutrack_cache_loader_seconds_bucket{family="course_detail",le="+Inf"} 2',
+            text,
+        )
+        self.assertIn(
+            'edutrack_cache_loader_seconds_sum{family="course_detail"} 0.25', text
+        )
+
+    @override_settings(METRICS_API_KEY="metrics-key")
+    def test_endpoint_requires_the_metrics_api_key(self):
+        url = reverse("cache-metrics")
+
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_API_KEY="wrong").status_code, 401)
+
+        response = self.client.get(url, HTTP_API_KEY="metrics-key")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
@@ -1,15 +1,31 @@
 # tests/test_courses_api.py
 
+import base64
+import json
 import random
 import string
+from io import StringIO
 
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from accounts.models import User, UserTypes
+from assignments.models import Assignment, Submission
 from courses.models import Course, Lesson, Enrollment
+from core.middleware import TooManyQueriesError
+from courses.serializers import (
+    EnrollmentSerializer, EnrollmentValuesSerializer, GetCourseSerializer, GetCourseValuesSerializer
+)
+from courses.services.course_service import PUBLISHED_COURSES_NAMESPACE, CourseService
+from services.cache_util import CacheUtil
+from services.pagination import CountingPaginator, CountStrategy
 
 
 def get_random_first_last_name():
@@ -300,3 +316,586 @@ class CourseAPITest(APITestCase):
         resp = self.client.delete(reverse('delete-lesson', args=[course.id, lesson_id]))
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         self.assertEqual(resp.data['message'], 'Lesson deleted successfully.')
+
+    def test_course_list_pages_are_cached_separately_and_invalidated(self):
+        """
+        1) Each page of the published course list is cached under its own key.
+        2) Creating a course invalidates every cached page at once.
+        """
+        CacheUtil.bump_namespace(PUBLISHED_COURSES_NAMESPACE)
+        for i in range(21):
+            Course.objects.create(
+                title=f'Course {i}', description='Desc', teacher=self.teacher1,
+                is_published=True, slug=f'paged-course-{i}'
+            )
+
+        self.client.force_authenticate(user=self.student1)
+        page1 = self.client.get(reverse('list-courses'))
+        page2 = self.client.get(reverse('list-courses'), {'page': 2})
+        self.assertEqual(page1.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(page1.data['results']), 20)
+        self.assertEqual(len(page2.data['results']), 1)
+        self.assertNotEqual(page1.data['results'][0]['id'], page2.data['results'][0]['id'])
+
+        self.client.force_authenticate(user=self.teacher1)
+        data = {'title': 'Newest', 'description': 'Desc', 'is_published': True, 'slug': 'newest'}
+        resp = self.client.post(reverse('create-course'), data)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.student1)
+        page2 = self.client.get(reverse('list-courses'), {'page': 2})
+        self.assertEqual(len(page2.data['results']), 2)
+        self.assertEqual(page2.data['count'], 22)
+
+    def test_course_detail_response_is_replayed_until_the_course_changes(self):
+        """
+        1) Repeated detail requests are served the same pre-rendered bytes + ETag.
+        2) Updating the course drops the cached response.
+        """
+        course = Course.objects.create(
+            title='Cached Course', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='cached-course'
+        )
+        detail_key = CacheUtil.generate_cache_key('course_detail', course.id)
+        CacheUtil.clear_cache(detail_key, CacheUtil.generate_response_cache_key(detail_key))
+
+        self.client.force_authenticate(user=self.student1)
+        first = self.client.get(reverse('get-course', args=[course.id]))
+        second = self.client.get(reverse('get-course', args=[course.id]))
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(second.data['title'], 'Cached Course')
+
+        self.client.force_authenticate(user=self.teacher1)
+        resp = self.client.patch(reverse('update-course', args=[course.id]), {'title': 'Renamed'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.student1)
+        resp = self.client.get(reverse('get-course', args=[course.id]))
+        self.assertEqual(resp.data['title'], 'Renamed')
+        self.assertNotEqual(resp['ETag'], first['ETag'])
+
+    def test_enrollments_can_be_paged_with_cursors(self):
+        """
+        1) `?pagination=cursor` switches to keyset pages without a count.
+        2) Following next links walks every enrollment exactly once.
+        3) The previous link of the last page returns the page before it.
+        """
+        for i in range(5):
+            course = Course.objects.create(
+                title=f'Course {i}', description='Desc', teacher=self.teacher1,
+                is_published=True, slug=f'cursor-course-{i}'
+            )
+            Enrollment.objects.create(student=self.student1, course=course)
+
+        self.client.force_authenticate(user=self.student1)
+        resp = self.client.get(reverse('list-enrollments'), {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', resp.data)
+        self.assertIsNone(resp.data['previous'])
+
+        pages = [resp.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+
+        seen = [row['id'] for page in pages for row in page['results']]
+        expected = list(
+            Enrollment.objects.filter(student=self.student1)
+            .order_by('-enrolled_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual(previous['results'], pages[1]['results'])
+        self.assertIsNotNone(previous['next'])
+
+        # decodable cursors with values of the wrong type are rejected, not a 500
+        for position in (['not-a-date', 'x'], [None, 1], ['2026-01-01T00:00:00Z']):
+            cursor = base64.urlsafe_b64encode(json.dumps({'p': position, 'r': False}).encode())
+            resp = self.client.get(reverse('list-enrollments'), {'cursor': cursor.decode()})
+            self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_course_list_total_can_be_skipped(self):
+        """
+        1) `?include_total=false` returns `count: null` without counting.
+        2) next/previous links still follow the actual rows.
+        3) Links leave the host out, so a cached page suits every client.
+        """
+        for i in range(21):
+            Course.objects.create(
+                title=f'Course {i}', description='Desc', teacher=self.teacher1,
+                is_published=True, slug=f'uncounted-course-{i}'
+            )
+
+        self.client.force_authenticate(user=self.student1)
+        page1 = self.client.get(
+            reverse('list-courses'), {'include_total': 'false'}, HTTP_HOST='localhost:8000'
+        )
+        self.assertEqual(page1.status_code, status.HTTP_200_OK)
+        self.assertTrue(page1.data['next'].startswith(reverse('list-courses') + '?'))
+        self.assertIsNone(page1.data['count'])
+        self.assertEqual(len(page1.data['results']), 20)
+        self.assertIsNotNone(page1.data['next'])
+
+        page2 = self.client.get(page1.data['next'])
+        self.assertIsNone(page2.data['count'])
+        self.assertEqual(len(page2.data['results']), 1)
+        self.assertIsNone(page2.data['next'])
+        self.assertIsNotNone(page2.data['previous'])
+
+    def test_cached_count_is_reused_for_the_same_filter(self):
+        Course.objects.create(
+            title='Counted', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='counted-course'
+        )
+        cache.clear()
+        queryset = Course.objects.filter(slug__startswith='counted')
+
+        first = CountingPaginator(queryset, 10, CountStrategy.cached)
+        first.page(1)
+        Course.objects.create(
+            title='Counted 2', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='counted-course-2'
+        )
+        second = CountingPaginator(queryset, 10, CountStrategy.cached)
+        second.page(1)
+
+        self.assertEqual(first.total, 1)
+        self.assertEqual(second.total, 1)
+        self.assertEqual(CountingPaginator(queryset, 10).page(1).paginator.total, 2)
+
+    def test_large_lists_reuse_their_count(self):
+        """Enrollment and submission lists count once, then reuse the cached total."""
+        course = Course.objects.create(
+            title='Big', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='big-course'
+        )
+        assignment = Assignment.objects.create(
+            course=course, title='A1', description='D',
+            due_date=timezone.now() + timezone.timedelta(days=1)
+        )
+        for student in (self.student1, self.student2):
+            Enrollment.objects.create(student=student, course=course)
+            Submission.objects.create(assignment=assignment, student=student, content='answer')
+        cache.clear()
+        self.client.force_authenticate(user=self.teacher1)
+
+        for url in (reverse('list-enrollments'), reverse('list-submissions', args=[assignment.id])):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            self.assertEqual(first.data['count'], 2)
+            with CaptureQueriesContext(connection) as queries:
+                second = self.client.get(url)
+            self.assertEqual(second.data['count'], 2)
+            self.assertEqual(
+                [q['sql'] for q in queries if 'COUNT(' in q['sql'].upper()], []
+            )
+
+    def test_course_list_fields_are_pushed_down_to_the_query(self):
+        """
+        1) `?fields=` trims each result and stops `description` being read.
+        2) `?exclude=` drops fields; unknown names are rejected.
+        """
+        Course.objects.create(
+            title='Sparse', description='Long text', teacher=self.teacher1,
+            is_published=True, slug='sparse-course'
+        )
+        self.client.force_authenticate(user=self.student1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('list-courses'), {'fields': 'id,title'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        selects = [q['sql'] for q in queries.captured_queries if 'courses_course' in q['sql']]
+        self.assertTrue(selects)
+        self.assertFalse(any('"description"' in sql for sql in selects))
+
+        response = self.client.get(reverse('list-courses'), {'exclude': 'description'})
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertIn('slug', response.data['results'][0])
+
+        response = self.client.get(reverse('list-courses'), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_enrollments_are_streamed_as_ndjson_or_csv(self):
+        """
+        1) Only the course's teacher can export its enrollments.
+        2) NDJSON has one JSON object per enrollment; CSV adds a header row.
+        """
+        course = Course.objects.create(
+            title='Exported', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='exported-course'
+        )
+        for student in (self.student1, self.student2):
+            Enrollment.objects.create(student=student, course=course)
+        url = reverse('export-enrollments', kwargs={'pk': course.id})
+
+        self.client.force_authenticate(user=self.teacher2)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.teacher1)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [row['student_username'] for row in rows],
+            [self.student1.username, self.student2.username],
+        )
+
+        response = self.client.get(url, {'file_format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,student,student_username,student_full_name,student_email,enrolled_at')
+        self.assertEqual(len(lines), 3)
+        self.assertIn(self.student2.email, lines[2])
+
+        response = self.client.get(url, {'file_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_query_counts_do_not_grow_with_rows(self):
+        """
+        1) Listing enrollments and lessons runs the same number of queries
+           for one row as for several.
+        2) QueryCountMiddleware reports the count and raises over the limit.
+        """
+        course = Course.objects.create(
+            title='Counted', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='query-count-course'
+        )
+        Enrollment.objects.create(student=self.student1, course=course)
+        Lesson.objects.create(course=course, title='L1', content='C', order=1)
+        self.client.force_authenticate(user=self.teacher1)
+
+        def count_queries(url):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        urls = [reverse('list-enrollments'), reverse('list-lessons', kwargs={'pk': course.id})]
+        single = [count_queries(url) for url in urls]
+
+        Enrollment.objects.create(student=self.student2, course=course)
+        for order in range(2, 6):
+            Lesson.objects.create(course=course, title=f'L{order}', content='C', order=order)
+        self.assertEqual([count_queries(url) for url in urls], single)
+
+        response = self.client.get(reverse('list-enrollments'))
+        self.assertTrue(response['X-Query-Count'].isdigit())
+        cache.clear()  # the page's total is cached too
+        with override_settings(QUERY_COUNT_LIMIT=1, QUERY_COUNT_RAISE=True):
+            with self.assertRaises(TooManyQueriesError):
+                self.client.get(reverse('list-enrollments'))
+
+    def test_values_serializers_match_the_model_serializers(self):
+        course = Course.objects.create(
+            title='Fast', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='fast-course'
+        )
+        Enrollment.objects.create(student=self.student1, course=course)
+
+        for queryset, serializer, values_serializer in [
+            (Course.objects.all(), GetCourseSerializer, GetCourseValuesSerializer),
+            (Enrollment.objects.all(), EnrollmentSerializer, EnrollmentValuesSerializer),
+        ]:
+            values = values_serializer.get_values_queryset(queryset)
+            self.assertEqual(
+                values_serializer(list(values), many=True).data,
+                serializer(queryset, many=True).data,
+            )
+
+        values = GetCourseValuesSerializer.get_values_queryset(Course.objects.all(), ['id', 'title'])
+        self.assertEqual(
+            GetCourseValuesSerializer(values.get(), fields=['id', 'title']).data,
+            {'id': course.id, 'title': 'Fast'},
+        )
+
+    def test_unchanged_reads_are_answered_with_not_modified(self):
+        """
+        1) Course detail carries ETag and Last-Modified, lesson lists an ETag only.
+        2) Sending them back gets a bodiless 304 until the data changes.
+        3) A deleted lesson is never hidden behind If-Modified-Since.
+        """
+        course = Course.objects.create(
+            title='Polled', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='polled-course'
+        )
+        lesson = Lesson.objects.create(course=course, title='L1', content='C', order=1)
+        self.client.force_authenticate(user=self.student1)
+
+        for url in (reverse('get-course', args=[course.id]), reverse('list-lessons', args=[course.id])):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(resp.content, b'')
+            self.assertEqual(resp['ETag'], first['ETag'])
+
+        detail = self.client.get(reverse('get-course', args=[course.id]))
+        resp = self.client.get(
+            reverse('get-course', args=[course.id]), HTTP_IF_MODIFIED_SINCE=detail['Last-Modified']
+        )
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        lessons_url = reverse('list-lessons', args=[course.id])
+        first = self.client.get(lessons_url)
+        self.assertNotIn('Last-Modified', first)
+        since = detail['Last-Modified']
+        self.client.force_authenticate(user=self.teacher1)
+        resp = self.client.delete(reverse('delete-lesson', args=[course.id, lesson.id]))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=self.student1)
+        resp = self.client.get(lessons_url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['count'], 0)
+        resp = self.client.get(lessons_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], first['ETag'])
+
+    def test_validators_describe_the_body_served_not_the_database(self):
+        """
+        1) An out-of-band edit the data cache has not caught up with keeps the
+           old body, and the old ETag and Last-Modified with it (304).
+        2) Once the caches are dropped, the new body gets a new ETag.
+        """
+        course = Course.objects.create(
+            title='Lagging', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='lagging-course'
+        )
+        url = reverse('get-course', args=[course.id])
+        self.client.force_authenticate(user=self.student1)
+        first = self.client.get(url)
+
+        Course.objects.filter(id=course.id).update(title='Edited', updated_at=timezone.now())
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        resp = self.client.get(url)
+        self.assertEqual(resp.data['title'], 'Lagging')
+        self.assertEqual(resp['ETag'], first['ETag'])
+
+        CourseService._invalidate_course_detail(str(course.id))
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['title'], 'Edited')
+        self.assertNotEqual(resp['ETag'], first['ETag'])
+
+    def test_a_new_course_is_not_hidden_by_an_earlier_miss(self):
+        placeholder = Course.objects.create(
+            title='Before', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='before-course'
+        )
+        next_id = placeholder.id + 1
+        self.client.force_authenticate(user=self.student1)
+        for url in (reverse('get-course', args=[next_id]), reverse('list-lessons', args=[next_id])):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.teacher1)
+        data = {'title': 'After', 'description': 'Desc', 'is_published': True, 'slug': 'after-course'}
+        resp = self.client.post(reverse('create-course'), data)
+        self.assertEqual(resp.data['id'], next_id)
+
+        self.client.force_authenticate(user=self.student1)
+        for url in (reverse('get-course', args=[next_id]), reverse('list-lessons', args=[next_id])):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_lessons_and_enrollments_can_be_added_in_bulk(self):
+        """
+        1) A lesson batch is rejected as a whole on a duplicate or taken order.
+        2) A valid batch is created and shows up in the (cached) lesson list.
+        3) Bulk enrollment skips students who are already enrolled.
+        """
+        course = Course.objects.create(
+            title='Bulk', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='bulk-course'
+        )
+        Lesson.objects.create(course=course, title='Intro', content='C', order=1)
+        lessons_url = reverse('list-lessons', args=[course.id])
+        bulk_url = reverse('bulk-add-lessons', args=[course.id])
+        self.client.force_authenticate(user=self.teacher1)
+        self.assertEqual(self.client.get(lessons_url).data['count'], 1)
+
+        batch = [{'title': f'L{order}', 'content': 'C', 'order': order} for order in (2, 3, 3)]
+        resp = self.client.post(bulk_url, {'lessons': batch}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        batch = [{'title': f'L{order}', 'content': 'C', 'order': order} for order in (1, 2, 3)]
+        resp = self.client.post(bulk_url, {'lessons': batch}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(course.lessons.count(), 1)
+
+        batch = [{'title': f'L{order}', 'content': 'C', 'order': order} for order in range(2, 42)]
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(bulk_url, {'lessons': batch}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertLess(len(queries), 10)
+        self.assertEqual(self.client.get(lessons_url).data['count'], 41)
+
+        Enrollment.objects.create(student=self.student1, course=course)
+        resp = self.client.post(
+            reverse('bulk-enroll', args=[course.id]),
+            {'students': [str(self.student1.id), str(self.student2.id)]},
+            format='json',
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data, {'enrolled': 1, 'already_enrolled': 1})
+        self.assertEqual(course.enrollments.count(), 2)
+
+        resp = self.client.post(
+            reverse('bulk-enroll', args=[course.id]),
+            {'students': [str(self.teacher2.id)]},
+            format='json',
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_submissions_can_be_graded_in_bulk(self):
+        course = Course.objects.create(
+            title='Graded', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='graded-course'
+        )
+        assignment = Assignment.objects.create(
+            course=course, title='A1', description='D',
+            due_date=timezone.now() + timezone.timedelta(days=1)
+        )
+        submissions = [
+            Submission.objects.create(assignment=assignment, student=student, content='answer')
+            for student in (self.student1, self.student2)
+        ]
+        url = reverse('bulk-grade-submissions', args=[assignment.id])
+        grades = [
+            {'submission': submissions[0].id, 'grade': '90.50', 'feedback': 'Good'},
+            {'submission': submissions[1].id, 'grade': '70'},
+        ]
+
+        self.client.force_authenticate(user=self.teacher2)
+        self.assertEqual(self.client.post(url, {'grades': grades}, format='json').status_code, 400)
+
+        self.client.force_authenticate(user=self.teacher1)
+        resp = self.client.post(
+            url, {'grades': grades + [{'submission': 999999, 'grade': '1'}]}, format='json'
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = self.client.post(url, {'grades': grades}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        graded = {s.id: s for s in Submission.objects.filter(assignment=assignment)}
+        self.assertEqual(str(graded[submissions[0].id].grade), '90.50')
+        self.assertEqual(graded[submissions[0].id].feedback, 'Good')
+        self.assertEqual(graded[submissions[1].id].status, Submission.STATUS_GRADED)
+
+    def test_gradebook_is_one_grid_and_follows_grading(self):
+        """
+        1) The gradebook grid is built with a fixed number of queries.
+        2) Grading a submission shows up in the (cached) grid and its CSV.
+        """
+        course = Course.objects.create(
+            title='Grid', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='grid-course'
+        )
+        for student in (self.student1, self.student2):
+            Enrollment.objects.create(student=student, course=course)
+        due = timezone.now() + timezone.timedelta(days=1)
+        first = Assignment.objects.create(course=course, title='A1', description='D', due_date=due)
+        second = Assignment.objects.create(
+            course=course, title='A2', description='D', due_date=due + timezone.timedelta(days=1)
+        )
+        submission = Submission.objects.create(assignment=second, student=self.student1, content='x')
+        url = reverse('gradebook', args=[course.id])
+
+        self.client.force_authenticate(user=self.teacher2)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.teacher1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            grid = self.client.get(url).data
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual([a['id'] for a in grid['assignments']], [first.id, second.id])
+        row = [s['id'] for s in grid['students']].index(self.student1.id)
+        self.assertEqual(grid['grades'][row], [None, None])
+        self.assertEqual(grid['statuses'][row], [None, Submission.STATUS_PENDING])
+
+        self.client.post(
+            reverse('bulk-grade-submissions', args=[second.id]),
+            {'grades': [{'submission': submission.id, 'grade': '88'}]},
+            format='json',
+        )
+        grid = self.client.get(url).data
+        self.assertEqual(grid['grades'][row], [None, '88.00'])
+
+        resp = self.client.get(reverse('export-gradebook', args=[course.id]), {'file_format': 'csv'})
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0],
+            f'student,student_username,student_full_name,assignment_{first.id},assignment_{second.id}',
+        )
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[row + 1].endswith(',,88.00'))
+
+    def test_course_counters_follow_writes_and_can_be_reconciled(self):
+        """
+        1) Enrolling, adding/deleting lessons and deleting assignments move the counters.
+        2) The cached course detail shows the new counts; the published list is not invalidated.
+        3) reconcile_course_counters repairs counters that have drifted.
+        """
+        course = Course.objects.create(
+            title='Counted', description='Desc', teacher=self.teacher1,
+            is_published=True, slug='counted-course'
+        )
+        cache.clear()
+        detail_url = reverse('get-course', args=[course.id])
+        self.client.force_authenticate(user=self.teacher1)
+        resp = self.client.get(detail_url)
+        self.assertEqual(
+            [resp.data[k] for k in ('enrollment_count', 'lesson_count', 'assignment_count')],
+            [0, 0, 0],
+        )
+        list_version = CacheUtil.get_namespace_version(PUBLISHED_COURSES_NAMESPACE)
+
+        self.client.force_authenticate(user=self.student1)
+        self.client.post(reverse('enroll-course', args=[course.id]))
+        self.client.post(reverse('enroll-course', args=[course.id]))
+
+        self.client.force_authenticate(user=self.teacher1)
+        self.client.post(
+            reverse('bulk-enroll', args=[course.id]),
+            {'students': [str(self.student1.id), str(self.student2.id)]},
+            format='json',
+        )
+        self.client.post(
+            reverse('bulk-add-lessons', args=[course.id]),
+            {'lessons': [{'title': f'L{order}', 'content': 'C', 'order': order} for order in (1, 2)]},
+            format='json',
+        )
+        lesson = course.lessons.get(order=2)
+        self.client.delete(reverse('delete-lesson', args=[course.id, lesson.id]))
+        resp = self.client.get(detail_url)
+        self.assertEqual(
+            [resp.data[k] for k in ('enrollment_count', 'lesson_count', 'assignment_count')],
+            [2, 1, 0],
+        )
+        self.assertEqual(CacheUtil.get_namespace_version(PUBLISHED_COURSES_NAMESPACE), list_version)
+
+        # rows written behind the services' back are picked up by reconciling
+        assignment = Assignment.objects.create(
+            course=course, title='A1', description='D',
+            due_date=timezone.now() + timezone.timedelta(days=1)
+        )
+        Course.objects.filter(id=course.id).update(enrollment_count=7, lesson_count=0)
+        out = StringIO()
+        call_command('reconcile_course_counters', batch_size=1, stdout=out)
+        self.assertIn('repaired 1', out.getvalue())
+        resp = self.client.get(detail_url)
+        self.assertEqual(
+            [resp.data[k] for k in ('enrollment_count', 'lesson_count', 'assignment_count')],
+            [2, 1, 1],
+        )
+
+        self.client.delete(reverse('delete-assignment', args=[assignment.id]))
+        course.refresh_from_db()
+        self.assertEqual(course.assignment_count, 0)